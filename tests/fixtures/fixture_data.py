@@ -12,6 +12,12 @@ def mock_media(settings):
         yield temp_directory
 
 
+@pytest.fixture(autouse=True)
+def isolated_media(mock_media):
+    """Keep files uploaded by tests out of the project MEDIA_ROOT."""
+    return mock_media
+
+
 @pytest.fixture
 def mixer():
     return _mixer
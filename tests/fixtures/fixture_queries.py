@@ -0,0 +1,19 @@
+import pytest
+
+
+@pytest.fixture(autouse=True, scope='session')
+def repeated_query_detector():
+    from core.queries import RepeatedQueryDetector
+
+    detector = RepeatedQueryDetector()
+    detector.connect()
+    yield detector
+    detector.disconnect()
+
+
+@pytest.fixture(autouse=True, scope='session')
+def slow_query_log_disabled():
+    from django.test import override_settings
+
+    with override_settings(SLOW_QUERY_THRESHOLD_MS=None):
+        yield
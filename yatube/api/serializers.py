@@ -0,0 +1,148 @@
+from django.db.models import Count
+
+
+class Field:
+    """
+    Описание поля ответа API.
+
+    :param getter: Функция, которая получает значение из объекта.
+    :param columns: Поля модели для only(). Поля связанных моделей
+        записываются через __ и подгружаются через select_related.
+    :param annotations: Аннотации запроса, нужные для значения.
+    """
+
+    def __init__(self, getter, columns=(), annotations=None):
+        self.getter = getter
+        self.columns = columns
+        self.annotations = annotations or {}
+
+
+def isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def user_stat(user, name):
+    stats = getattr(user, 'stats', None)
+    return getattr(stats, name) if stats is not None else 0
+
+
+POST_FIELDS: dict = {
+    'id': Field(lambda post: post.pk, ('id',)),
+    'text': Field(lambda post: post.text, ('text',)),
+    'pub_date': Field(lambda post: isoformat(post.pub_date), ('pub_date',)),
+    'author': Field(
+        lambda post: post.author.username,
+        ('author', 'author__username'),
+    ),
+    'group': Field(
+        lambda post: post.group.slug if post.group_id else None,
+        ('group', 'group__slug'),
+    ),
+    'image': Field(
+        lambda post: post.image.url if post.image else None,
+        ('image',),
+    ),
+    'like_count': Field(lambda post: post.like_count, ('like_count',)),
+    'comment_count': Field(
+        lambda post: post.comment_count,
+        annotations={'comment_count': Count('comments', distinct=True)},
+    ),
+}
+
+GROUP_FIELDS: dict = {
+    'slug': Field(lambda group: group.slug, ('slug',)),
+    'title': Field(lambda group: group.title, ('title',)),
+    'description': Field(
+        lambda group: group.description, ('description',),
+    ),
+    'post_count': Field(
+        lambda group: group.post_count,
+        annotations={'post_count': Count('posts', distinct=True)},
+    ),
+}
+
+PROFILE_FIELDS: dict = {
+    'username': Field(lambda user: user.username, ('username',)),
+    'full_name': Field(
+        lambda user: user.get_full_name(), ('first_name', 'last_name'),
+    ),
+    'post_count': Field(
+        lambda user: user.post_count,
+        annotations={'post_count': Count('posts', distinct=True)},
+    ),
+    'followers_count': Field(
+        lambda user: user_stat(user, 'followers_count'),
+        ('stats', 'stats__followers_count'),
+    ),
+    'following_count': Field(
+        lambda user: user_stat(user, 'following_count'),
+        ('stats', 'stats__following_count'),
+    ),
+}
+
+COMMENT_FIELDS: dict = {
+    'id': Field(lambda comment: comment.pk, ('id',)),
+    'text': Field(lambda comment: comment.text, ('text',)),
+    'created': Field(
+        lambda comment: isoformat(comment.created), ('created',),
+    ),
+    'author': Field(
+        lambda comment: comment.author.username,
+        ('author', 'author__username'),
+    ),
+}
+
+
+class UnknownFieldError(ValueError):
+    """Запрошено поле, которого нет в описании ресурса."""
+
+
+def select_fields(available, requested):
+    """
+    Выбирает поля ответа по параметру fields.
+
+    :param available: Словарь полей ресурса.
+    :param requested: Значение параметра fields, имена через запятую.
+    :return: Словарь выбранных полей в порядке запроса или все поля.
+    """
+    if not requested:
+        return available
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise UnknownFieldError(', '.join(unknown))
+    return {name: available[name] for name in names}
+
+
+def apply_fields(queryset, fields, required=('id',)):
+    """
+    Ограничивает запрос колонками выбранных полей.
+
+    :param queryset: Исходный запрос.
+    :param fields: Выбранные поля ресурса.
+    :param required: Колонки, которые нужны всегда, например для курсора.
+    :return: Запрос с only(), select_related() и аннотациями.
+    """
+    columns = set(required)
+    annotations = {}
+    for field in fields.values():
+        columns.update(field.columns)
+        annotations.update(field.annotations)
+    related = {column.split('__')[0] for column in columns if '__' in column}
+    queryset = queryset.select_related(None)
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*columns).annotate(**annotations)
+
+
+def serialize(objs, fields) -> list:
+    """
+    Превращает объекты в словари выбранных полей.
+
+    :param objs: Объекты страницы.
+    :param fields: Выбранные поля ресурса.
+    """
+    return [
+        {name: field.getter(obj) for name, field in fields.items()}
+        for obj in objs
+    ]
@@ -0,0 +1,131 @@
+import base64
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Group, Post
+from posts.services import follow_author
+
+User = get_user_model()
+COUNT_TEST_POSTS: int = 5
+LIMIT: int = 2
+
+
+class ApiViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {number}',
+                author=cls.author,
+                group=cls.group,
+            )
+            for number in range(COUNT_TEST_POSTS)
+        ]
+        Comment.objects.create(
+            post=cls.posts[-1], author=cls.reader, text='Комментарий',
+        )
+        follow_author(cls.reader, cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(ApiViewsTests.reader)
+        cache.clear()
+
+    def test_sparse_fields(self):
+        """Ответ содержит только запрошенные поля"""
+        response = self.guest_client.get(
+            reverse('api:post_list'), {'fields': 'id,comment_count'}
+        )
+        self.assertEqual(
+            response.json()['results'][0],
+            {'id': ApiViewsTests.posts[-1].pk, 'comment_count': 1},
+            'Поля поста не соответствуют запрошенным',
+        )
+        response = self.guest_client.get(
+            reverse('api:post_list'), {'fields': 'password'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_cursor_pagination(self):
+        """Ссылки next проходят по всем постам без повторов"""
+        url = reverse(
+            'api:group_posts', kwargs={'slug': ApiViewsTests.group.slug}
+        ) + f'?fields=id&limit={LIMIT}'
+        ids = []
+        while url:
+            data = self.guest_client.get(url).json()
+            ids.extend(post['id'] for post in data['results'])
+            url = data['next']
+        self.assertEqual(
+            ids,
+            [post.pk for post in reversed(ApiViewsTests.posts)],
+            'Курсорная пагинация вернула не все посты',
+        )
+
+    def test_invalid_cursor(self):
+        """Курсор с недопустимыми для базы значениями дает первую страницу"""
+        for raw in (
+            '2020-01-01T00:00:00+00:00|5',
+            '2020-01-01T00:00:00|99999999999999999999999',
+        ):
+            token = base64.urlsafe_b64encode(raw.encode()).decode()
+            with self.subTest(raw=raw):
+                response = self.guest_client.get(
+                    reverse('api:post_list'), {'after': token},
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertIsNone(response.json()['previous'])
+
+    def test_list_queries_do_not_grow(self):
+        """Число запросов списка не зависит от числа постов"""
+        url = reverse(
+            'api:profile_posts',
+            kwargs={'username': ApiViewsTests.author.username},
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(url, {'limit': 1})
+        with CaptureQueriesContext(connection) as more_queries:
+            self.guest_client.get(url, {'limit': COUNT_TEST_POSTS})
+        self.assertEqual(
+            len(more_queries),
+            len(queries),
+            'Поля постов загружаются отдельными запросами',
+        )
+
+    def test_profile(self):
+        """Профиль содержит счетчики постов и подписчиков"""
+        response = self.guest_client.get(
+            reverse(
+                'api:profile',
+                kwargs={'username': ApiViewsTests.author.username},
+            ),
+            {'fields': 'post_count,followers_count'},
+        )
+        self.assertEqual(
+            response.json(),
+            {'post_count': COUNT_TEST_POSTS, 'followers_count': 1},
+            'Счетчики профиля не соответствуют ожидаемым',
+        )
+
+    def test_follow_feed(self):
+        """Лента подписок доступна только авторизованному пользователю"""
+        response = self.guest_client.get(reverse('api:follow_feed'))
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        response = self.reader_client.get(
+            reverse('api:follow_feed'), {'fields': 'id'}
+        )
+        self.assertEqual(
+            len(response.json()['results']),
+            COUNT_TEST_POSTS,
+            'Лента подписок не содержит посты автора',
+        )
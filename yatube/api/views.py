@@ -0,0 +1,185 @@
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from posts.cache import (AUTHOR_SCOPE, GROUP_SCOPE, POST_SCOPE, POSTS_SCOPE,
+                         cache_versioned_page, conditional_page,
+                         post_detail_scopes)
+from posts.models import Comment, Group, Post
+from posts.paginators import CursorPaginator
+from posts.services import (get_author_posts, get_follow_posts,
+                            get_group_posts, get_index_posts)
+
+from .serializers import (COMMENT_FIELDS, GROUP_FIELDS, POST_FIELDS,
+                          PROFILE_FIELDS, UnknownFieldError, apply_fields,
+                          select_fields, serialize)
+
+DEFAULT_LIMIT: int = 20
+MAX_LIMIT: int = 100
+JSON_PARAMS: dict = {'ensure_ascii': False}
+
+User = get_user_model()
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def error_response(detail, status):
+    return json_response({'detail': detail}, status=status)
+
+
+def get_limit(request) -> int:
+    """
+    Читает размер страницы из параметра limit.
+
+    :param request: Объект запроса.
+    :return: Размер от 1 до MAX_LIMIT, по умолчанию DEFAULT_LIMIT.
+    """
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        return DEFAULT_LIMIT
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def page_link(request, param, token):
+    """
+    Строит ссылку на соседнюю страницу с сохранением остальных параметров.
+
+    :param request: Объект запроса.
+    :param param: Имя параметра курсора, after или before.
+    :param token: Токен курсора или None, если страницы нет.
+    """
+    if token is None:
+        return None
+    query = request.GET.copy()
+    query.pop('after', None)
+    query.pop('before', None)
+    query[param] = token
+    return f'{request.path}?{query.urlencode()}'
+
+
+def list_response(request, queryset, available, date_field='pub_date'):
+    """
+    Отдает страницу списка с курсорной пагинацией.
+
+    Аргументы:
+    - request (HttpRequest): объект запроса
+    - queryset (QuerySet): объекты списка
+    - available (dict): поля ресурса
+    - date_field (str): поле даты для курсора
+
+    Возвращает:
+    - JsonResponse: объекты страницы и ссылки на соседние страницы
+    """
+    try:
+        fields = select_fields(available, request.GET.get('fields'))
+    except UnknownFieldError as error:
+        return error_response(f'Неизвестные поля: {error}', 400)
+    queryset = apply_fields(queryset, fields, required=('id', date_field))
+    paginator = CursorPaginator(
+        queryset, get_limit(request), date_field=date_field,
+    )
+    before = request.GET.get('before')
+    if before:
+        page = paginator.page_before(before)
+    else:
+        page = paginator.page_after(request.GET.get('after'))
+    return json_response({
+        'results': serialize(page, fields),
+        'next': page_link(request, 'after', page.next_cursor),
+        'previous': page_link(request, 'before', page.previous_cursor),
+    })
+
+
+def object_response(request, queryset, available, not_found):
+    """
+    Отдает один объект с выбранными полями.
+
+    Аргументы:
+    - request (HttpRequest): объект запроса
+    - queryset (QuerySet): запрос, который выбирает объект
+    - available (dict): поля ресурса
+    - not_found (str): сообщение, если объекта нет
+
+    Возвращает:
+    - JsonResponse: поля объекта
+    """
+    try:
+        fields = select_fields(available, request.GET.get('fields'))
+    except UnknownFieldError as error:
+        return error_response(f'Неизвестные поля: {error}', 400)
+    obj = apply_fields(queryset, fields, required=()).first()
+    if obj is None:
+        return error_response(not_found, 404)
+    return json_response(serialize([obj], fields)[0])
+
+
+@cache_versioned_page(POSTS_SCOPE)
+def post_list(request):
+    return list_response(request, get_index_posts(), POST_FIELDS)
+
+
+@conditional_page(post_detail_scopes)
+def post_detail(request, post_id):
+    return object_response(
+        request,
+        Post.objects.filter(pk=post_id),
+        POST_FIELDS,
+        'Пост не найден',
+    )
+
+
+@conditional_page(POST_SCOPE)
+@cache_versioned_page(POST_SCOPE)
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return error_response('Пост не найден', 404)
+    return list_response(
+        request,
+        Comment.objects.filter(post_id=post_id).order_by('-created'),
+        COMMENT_FIELDS,
+        date_field='created',
+    )
+
+
+def group_list(request):
+    try:
+        fields = select_fields(GROUP_FIELDS, request.GET.get('fields'))
+    except UnknownFieldError as error:
+        return error_response(f'Неизвестные поля: {error}', 400)
+    groups = apply_fields(Group.objects.order_by('title'), fields)
+    return json_response({'results': serialize(groups, fields)})
+
+
+@conditional_page(GROUP_SCOPE)
+@cache_versioned_page(GROUP_SCOPE)
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return error_response('Группа не найдена', 404)
+    return list_response(request, get_group_posts(group), POST_FIELDS)
+
+
+@conditional_page(AUTHOR_SCOPE)
+def profile(request, username):
+    return object_response(
+        request,
+        User.objects.filter(username=username),
+        PROFILE_FIELDS,
+        'Пользователь не найден',
+    )
+
+
+@conditional_page(AUTHOR_SCOPE)
+@cache_versioned_page(AUTHOR_SCOPE)
+def profile_posts(request, username):
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return error_response('Пользователь не найден', 404)
+    return list_response(request, get_author_posts(author), POST_FIELDS)
+
+
+def follow_feed(request):
+    if not request.user.is_authenticated:
+        return error_response('Требуется авторизация', 401)
+    return list_response(request, get_follow_posts(request.user), POST_FIELDS)
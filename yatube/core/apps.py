@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        if getattr(settings, 'METRICS_ENABLED', False):
+            from . import metrics
+
+            metrics.install()
+        if getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', None) is not None:
+            from . import slow_queries
+
+            slow_queries.install()
@@ -0,0 +1,95 @@
+import json
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SORT_KEYS: dict = {
+    'total': lambda group: group['total_ms'],
+    'max': lambda group: group['slowest']['duration_ms'],
+    'count': lambda group: group['count'],
+    'mean': lambda group: group['total_ms'] / group['count'],
+}
+
+
+def summarize(lines) -> dict:
+    """
+    Группирует записи журнала по отпечаткам.
+
+    :param lines: Строки JSON из SLOW_QUERY_LOG.
+    :return: Словарь {отпечаток: сводка} с количеством, суммарным
+        временем, маршрутами и самой медленной записью.
+    """
+    groups = defaultdict(lambda: {
+        'count': 0, 'total_ms': 0.0, 'views': Counter(), 'slowest': None,
+    })
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        group = groups[record['fingerprint']]
+        group['count'] += 1
+        group['total_ms'] += record['duration_ms']
+        group['views'][record['view'] or '-'] += 1
+        slowest = group['slowest']
+        if slowest is None or record['duration_ms'] > slowest['duration_ms']:
+            group['slowest'] = record
+    return groups
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает самые тяжелые запросы из журнала медленных запросов '
+        'с маршрутами и планом выполнения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            help='Файл журнала. По умолчанию SLOW_QUERY_LOG.',
+        )
+        parser.add_argument(
+            '--top', type=int, default=10, help='Сколько запросов вывести.',
+        )
+        parser.add_argument(
+            '--sort',
+            choices=sorted(SORT_KEYS),
+            default='total',
+            help='Порядок: суммарное, максимальное, среднее время '
+                 'или количество.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path'] or settings.SLOW_QUERY_LOG
+        try:
+            with open(path, encoding='utf-8') as lines:
+                groups = summarize(lines)
+        except FileNotFoundError:
+            raise CommandError(f'Журнал не найден: {path}')
+        sort_key = SORT_KEYS[options['sort']]
+        ranked = sorted(
+            groups.items(), key=lambda item: sort_key(item[1]), reverse=True,
+        )
+        for shape, group in ranked[:options['top']]:
+            self.report(shape, group)
+        self.stdout.write(
+            f'Всего отпечатков: {len(groups)}, '
+            f'запросов: {sum(group["count"] for group in groups.values())}'
+        )
+
+    def report(self, shape, group):
+        slowest = group['slowest']
+        views = ', '.join(
+            f'{view} x{count}' for view, count in group['views'].most_common(3)
+        )
+        self.stdout.write(self.style.SQL_KEYWORD(
+            f'{group["count"]} запросов, всего {group["total_ms"]:.1f} мс, '
+            f'среднее {group["total_ms"] / group["count"]:.1f} мс, '
+            f'максимум {slowest["duration_ms"]:.1f} мс'
+        ))
+        self.stdout.write(f'  маршруты: {views}')
+        self.stdout.write(f'  {shape}')
+        for step in slowest['plan']:
+            self.stdout.write(f'    {step}')
+        self.stdout.write('')
@@ -0,0 +1,406 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.module_loading import import_string
+
+DEFAULT_BUCKETS: tuple = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+METRICS_FLUSH_INTERVAL: float = 1.0
+DB_OPERATIONS: frozenset = frozenset(('SELECT', 'INSERT', 'UPDATE', 'DELETE'))
+CONTENT_TYPE: str = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def format_value(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(labels) -> str:
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n'),
+        )
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+def process_alive(pid) -> bool:
+    """
+    Проверяет, что процесс существует.
+
+    Вне POSIX процесс считается живым: там os.kill завершает процесс.
+    """
+    if os.name != 'posix':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def file_pid(filename):
+    try:
+        return int(os.path.basename(filename)[:-len('.json')])
+    except ValueError:
+        return None
+
+
+def load_records(filename) -> list:
+    """
+    Читает значения процесса из файла.
+
+    :return: Пары ((имя, суффикс, метки, корзина), значение) или пустой
+        список, если файл недоступен.
+    """
+    try:
+        with open(filename) as source:
+            records = json.load(source)
+    except (OSError, ValueError):
+        return []
+    return [
+        ((name, suffix, tuple(tuple(pair) for pair in labels), bucket), value)
+        for name, suffix, labels, bucket, value in records
+    ]
+
+
+class MetricsRegistry:
+    """
+    Хранилище метрик с агрегацией по процессам через файлы.
+
+    Каждый процесс копит значения в памяти. После share() он не чаще
+    раза в METRICS_FLUSH_INTERVAL секунд записывает их в свой файл
+    <каталог>/<pid>.json, а при выдаче метрики всех файлов складываются.
+    Файл завершившегося процесса забирает процесс, который выдает
+    метрики: значения переходят в его собственный файл, поэтому счетчики
+    не теряются, а файлы не копятся. Без share() выдаются метрики только
+    текущего процесса.
+
+    :param directory: Каталог файлов процессов.
+    """
+
+    def __init__(self, directory=None):
+        self.metrics = {}
+        self.samples = defaultdict(float)
+        self.absorbed = defaultdict(float)
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.flushed = time.monotonic()
+        self.directory = directory
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def share(self, directory):
+        """
+        Включает запись значений процесса в общий каталог.
+
+        Вызывается только в процессах, которые обслуживают запросы, -
+        в wsgi.py. Тесты и команды manage.py не смешивают свои значения
+        с метриками сервиса.
+
+        :param directory: Каталог файлов процессов развертывания.
+        """
+        self.directory = directory
+
+    def _check_fork(self):
+        if os.getpid() != self.pid:
+            # Процесс создан через fork: значения родителя уже
+            # записаны в его файл.
+            self.samples.clear()
+            self.absorbed.clear()
+            self.pid = os.getpid()
+
+    def add(self, key, amount):
+        """
+        Прибавляет значение к образцу.
+
+        :param key: Кортеж (имя, суффикс, метки, номер корзины).
+        :param amount: Прибавляемое значение.
+        """
+        with self.lock:
+            self._check_fork()
+            self.samples[key] += amount
+        if time.monotonic() - self.flushed >= METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def path(self):
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, f'{self.pid}.json')
+
+    def flush(self):
+        """Записывает значения процесса и забранные значения в его файл."""
+        self.flushed = time.monotonic()
+        with self.lock:
+            self._check_fork()
+            path = self.path()
+            if path is None:
+                return
+            values = defaultdict(float, self.absorbed)
+            for key, value in self.samples.items():
+                values[key] += value
+        records = [
+            [name, suffix, labels, bucket, value]
+            for (name, suffix, labels, bucket), value in values.items()
+        ]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as output:
+            json.dump(records, output)
+        os.replace(tmp_path, path)
+
+    def absorb_dead(self):
+        """
+        Забирает значения из файлов завершившихся процессов.
+
+        Файл переименовывается перед чтением, поэтому его забирает только
+        один процесс, даже если метрики выдают несколько процессов сразу.
+        """
+        pattern = os.path.join(self.directory, '*.json')
+        for filename in glob.glob(pattern):
+            pid = file_pid(filename)
+            if pid is None or pid == self.pid or process_alive(pid):
+                continue
+            claimed = f'{filename}.{self.pid}'
+            try:
+                os.rename(filename, claimed)
+            except OSError:
+                continue
+            with self.lock:
+                for key, value in load_records(claimed):
+                    self.absorbed[key] += value
+            self.flush()
+            os.remove(claimed)
+
+    def collect(self) -> dict:
+        """
+        Складывает значения всех процессов.
+
+        :return: Словарь {(имя, суффикс, метки, корзина): значение}.
+        """
+        with self.lock:
+            self._check_fork()
+            if self.path() is None:
+                return dict(self.samples)
+        self.absorb_dead()
+        self.flush()
+        totals = defaultdict(float)
+        for filename in glob.glob(os.path.join(self.directory, '*.json')):
+            for key, value in load_records(filename):
+                totals[key] += value
+        return totals
+
+    def exposition(self) -> str:
+        """Метрики в текстовом формате Prometheus."""
+        samples = defaultdict(list)
+        for key, value in sorted(self.collect().items()):
+            samples[key[0]].append((key[1:], value))
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            lines.extend(metric.expose(samples.get(name, [])))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+atexit.register(REGISTRY.flush)
+
+
+class Metric:
+    """
+    Базовая метрика с метками.
+
+    :param name: Имя в формате Prometheus.
+    :param documentation: Описание для строки HELP.
+    :param labelnames: Имена меток.
+    """
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(),
+                 registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry
+        registry.register(self)
+
+    def label_pairs(self, labels) -> tuple:
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        self.registry.add(
+            (self.name, '', self.label_pairs(labels), None), amount,
+        )
+
+    def expose(self, samples):
+        for (_, labels, _), value in samples:
+            yield f'{self.name}{format_labels(labels)} {format_value(value)}'
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, *args, buckets=DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        labels = self.label_pairs(labels)
+        bucket = bisect_left(self.buckets, value)
+        self.registry.add((self.name, '_bucket', labels, bucket), 1)
+        self.registry.add((self.name, '_sum', labels, None), value)
+        self.registry.add((self.name, '_count', labels, None), 1)
+
+    def expose(self, samples):
+        series = defaultdict(dict)
+        for (suffix, labels, bucket), value in samples:
+            series[labels][(suffix, bucket)] = value
+        for labels, values in series.items():
+            cumulative = 0
+            for index, bound in enumerate(self.buckets):
+                cumulative += values.get(('_bucket', index), 0)
+                bucket_labels = labels + (('le', format_value(bound)),)
+                yield (
+                    f'{self.name}_bucket{format_labels(bucket_labels)} '
+                    f'{format_value(cumulative)}'
+                )
+            for suffix in ('_sum', '_count'):
+                yield (
+                    f'{self.name}{suffix}{format_labels(labels)} '
+                    f'{format_value(values.get((suffix, None), 0))}'
+                )
+
+
+REQUEST_DURATION = Histogram(
+    'yatube_http_request_duration_seconds',
+    'Время ответа по представлениям.',
+    ('view', 'method'),
+)
+REQUESTS = Counter(
+    'yatube_http_requests_total',
+    'Ответы по представлениям и кодам.',
+    ('view', 'method', 'status'),
+)
+CACHE_REQUESTS = Counter(
+    'yatube_cache_requests_total',
+    'Чтения ключей из кеша: hit или miss.',
+    ('backend', 'result'),
+)
+DB_QUERY_DURATION = Histogram(
+    'yatube_db_query_duration_seconds',
+    'Время SQL-запросов.',
+    ('alias', 'operation'),
+)
+
+_MISSING = object()
+_state = threading.local()
+
+
+def db_metrics_wrapper(alias):
+    """Обертка execute_wrapper, которая замеряет запросы соединения."""
+    def wrapper(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            operation = sql.lstrip()[:6].upper()
+            DB_QUERY_DURATION.observe(
+                time.perf_counter() - started,
+                alias=alias,
+                operation=operation if operation in DB_OPERATIONS else 'OTHER',
+            )
+    wrapper.metrics_alias = alias
+    return wrapper
+
+
+def add_db_metrics(connection, **kwargs):
+    """Подключает замер запросов к соединению, если его еще нет."""
+    wrappers = connection.execute_wrappers
+    if not any(hasattr(wrapper, 'metrics_alias') for wrapper in wrappers):
+        wrappers.append(db_metrics_wrapper(connection.alias))
+
+
+def counted_get(backend, method):
+    @wraps(method)
+    def get(self, key, default=None, version=None):
+        value = method(self, key, _MISSING, version)
+        if not getattr(_state, 'counting', False):
+            CACHE_REQUESTS.inc(
+                backend=backend,
+                result='miss' if value is _MISSING else 'hit',
+            )
+        return default if value is _MISSING else value
+    return get
+
+
+def counted_get_many(backend, method):
+    @wraps(method)
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        _state.counting = True
+        try:
+            found = method(self, keys, version)
+        finally:
+            _state.counting = False
+        CACHE_REQUESTS.inc(len(found), backend=backend, result='hit')
+        CACHE_REQUESTS.inc(
+            len(keys) - len(found), backend=backend, result='miss',
+        )
+        return found
+    return get_many
+
+
+def install_cache_metrics():
+    """
+    Оборачивает чтения у классов бэкендов из CACHES.
+
+    get_many базового класса читает ключи через get, поэтому внутри
+    get_many отдельные get не считаются.
+    """
+    backends = {
+        import_string(options['BACKEND'])
+        for options in settings.CACHES.values()
+    }
+    for backend in backends:
+        if getattr(backend.get, 'metrics_counted', False):
+            continue
+        for name, wrap in (('get', counted_get),
+                           ('get_many', counted_get_many)):
+            wrapped = wrap(backend.__name__, getattr(backend, name))
+            wrapped.metrics_counted = True
+            setattr(backend, name, wrapped)
+
+
+def install():
+    """Подключает метрики базы и кеша."""
+    connection_created.connect(add_db_metrics)
+    for connection in connections.all():
+        add_db_metrics(connection)
+    install_cache_metrics()
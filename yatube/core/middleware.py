@@ -0,0 +1,183 @@
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import Template
+from sorl.thumbnail.base import ThumbnailBackend
+
+from .metrics import REQUEST_DURATION, REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Метрики, которые замеряются обертками методов, и классы с методами.
+TIMED_METHODS: tuple = (
+    ('tpl', Template, 'render'),
+    ('thumb', ThumbnailBackend, 'get_thumbnail'),
+)
+METRIC_DESCRIPTIONS: dict = {
+    'db': 'SQL',
+    'tpl': 'Templates',
+    'thumb': 'Thumbnails',
+    'total': 'Total',
+}
+
+_state = threading.local()
+
+
+class RequestProfile:
+    """Время и количество вызовов по метрикам одного запроса."""
+
+    def __init__(self):
+        self.durations = Counter()
+        self.counts = Counter()
+        self.depth = Counter()
+
+    @contextmanager
+    def measure(self, metric):
+        """
+        Замеряет вызов. Вложенные вызовы той же метрики, например
+        render_to_string внутри шаблона, не считаются дважды.
+        """
+        self.counts[metric] += 1
+        self.depth[metric] += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.depth[metric] -= 1
+            if not self.depth[metric]:
+                self.durations[metric] += time.perf_counter() - started
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        with self.measure('db'):
+            return execute(sql, params, many, context)
+
+    def header(self) -> str:
+        """Значение заголовка Server-Timing, длительности в миллисекундах."""
+        entries = []
+        for metric, description in METRIC_DESCRIPTIONS.items():
+            if metric not in self.counts:
+                continue
+            entry = (
+                f'{metric};dur={self.durations[metric] * 1000:.1f};'
+                f'desc="{description}'
+            )
+            if metric != 'total':
+                entry += f' x{self.counts[metric]}'
+            entries.append(entry + '"')
+        return ', '.join(entries)
+
+
+def timed(metric, method):
+    """
+    Оборачивает метод замером для профилируемого запроса.
+
+    Вне профилируемых запросов обертка стоит одну проверку атрибута.
+    """
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        profile = getattr(_state, 'profile', None)
+        if profile is None:
+            return method(*args, **kwargs)
+        with profile.measure(metric):
+            return method(*args, **kwargs)
+    wrapper.timed_metric = metric
+    return wrapper
+
+
+def install_timers():
+    """Один раз оборачивает методы из TIMED_METHODS."""
+    for metric, cls, name in TIMED_METHODS:
+        method = getattr(cls, name)
+        if not hasattr(method, 'timed_metric'):
+            setattr(cls, name, timed(metric, method))
+
+
+class ServerTimingMiddleware:
+    """
+    Профилирует часть запросов и отдает замеры в заголовке Server-Timing.
+
+    Для запросов из выборки замеряет время и количество SQL-запросов,
+    отрисовки шаблонов и создания миниатюр, а также общее время ответа,
+    и пишет их строкой JSON в лог core.middleware. Доля запросов задается
+    настройкой SERVER_TIMING_SAMPLE_RATE, при нуле middleware
+    отключается полностью. Содержимое потоковых ответов создается после
+    выхода из middleware и в замеры не входит.
+    """
+
+    def __init__(self, get_response):
+        self.sample_rate = getattr(settings, 'SERVER_TIMING_SAMPLE_RATE', 0)
+        if not self.sample_rate:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        install_timers()
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        profile = RequestProfile()
+        _state.profile = profile
+        try:
+            with ExitStack() as stack, profile.measure('total'):
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(profile.execute_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            _state.profile = None
+        response['Server-Timing'] = profile.header()
+        self.log(request, response, profile)
+        return response
+
+    def log(self, request, response, profile):
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+        }
+        for metric in METRIC_DESCRIPTIONS:
+            record[f'{metric}_ms'] = round(
+                profile.durations[metric] * 1000, 1,
+            )
+        record['db_queries'] = profile.counts['db']
+        logger.info(json.dumps(record))
+
+
+class MetricsMiddleware:
+    """
+    Считает ответы и время ответа по именам маршрутов.
+
+    Включается настройкой METRICS_ENABLED. Запросы, которые не дошли до
+    представления, например 404, учитываются с view="<unresolved>".
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        match = request.resolver_match
+        view = match.view_name if match else '<unresolved>'
+        REQUEST_DURATION.observe(
+            time.perf_counter() - started,
+            view=view,
+            method=request.method,
+        )
+        REQUESTS.inc(
+            view=view, method=request.method, status=response.status_code,
+        )
+        return response
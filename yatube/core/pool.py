@@ -0,0 +1,61 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+import django
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def create_pool(workers):
+    """
+    Создает пул рабочих процессов с настроенным Django.
+
+    Процессы запускаются через spawn, поэтому не наследуют открытые
+    соединения с базой и кешем из веб-процесса.
+
+    :param workers: Количество процессов.
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context('spawn'),
+        initializer=django.setup,
+    )
+
+
+def _log_failure(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(
+            'Фоновая задача завершилась с ошибкой',
+            exc_info=future.exception(),
+        )
+
+
+def submit(func, *args):
+    """
+    Выполняет функцию в общем пуле процессов вне обработки запроса.
+
+    Если BACKGROUND_WORKERS равно 0, функция выполняется сразу в текущем
+    процессе.
+
+    :param func: Функция уровня модуля, доступная по импорту.
+    :param args: Аргументы функции, которые можно сериализовать pickle.
+    """
+    global _executor
+    workers = settings.BACKGROUND_WORKERS
+    if not workers:
+        func(*args)
+        return None
+    if _executor is None:
+        _executor = create_pool(workers)
+    try:
+        future = _executor.submit(func, *args)
+    except BrokenProcessPool:
+        _executor = create_pool(workers)
+        future = _executor.submit(func, *args)
+    future.add_done_callback(_log_failure)
+    return future
@@ -0,0 +1,85 @@
+import re
+from collections import Counter
+
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+MAX_QUERY_REPEATS: int = 5
+SQL_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+SQL_VALUE_LIST = re.compile(r'\((?:\?\s*,\s*)*\?\)')
+SQL_SPACES = re.compile(r'\s+')
+
+
+def fingerprint(sql) -> str:
+    """
+    Приводит SQL к форме без значений.
+
+    Строки, числа и параметры заменяются на ?, списки значений IN и
+    VALUES любой длины - на (...). Запросы, которые отличаются только
+    значениями, получают одинаковый отпечаток.
+
+    :param sql: Текст запроса.
+    """
+    shape = SQL_LITERAL.sub('?', sql)
+    shape = SQL_VALUE_LIST.sub('(...)', shape)
+    return SQL_SPACES.sub(' ', shape).strip()
+
+
+class RepeatedQueriesError(AssertionError):
+    """Запрос одной формы выполнен за один HTTP-запрос слишком много раз."""
+
+
+class RepeatedQueryDetector:
+    """
+    Находит N+1: одинаковые по форме запросы внутри одного HTTP-запроса.
+
+    Обертка execute_wrapper считает запросы по отпечаткам между сигналами
+    request_started и request_finished. Для потоковых ответов
+    request_finished приходит после выдачи всего содержимого, поэтому
+    учитываются и запросы во время потоковой отдачи.
+
+    :param max_repeats: Сколько раз запрос одной формы может повториться.
+    """
+
+    def __init__(self, max_repeats=MAX_QUERY_REPEATS):
+        self.max_repeats = max_repeats
+        self.shapes = None
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.shapes is not None:
+            self.shapes[fingerprint(sql)] += 1
+        return execute(sql, params, many, context)
+
+    def request_started(self, **kwargs):
+        self.shapes = Counter()
+
+    def request_finished(self, **kwargs):
+        shapes, self.shapes = self.shapes, None
+        if not shapes:
+            return
+        repeated = [
+            f'{count} x {shape}'
+            for shape, count in shapes.most_common()
+            if count > self.max_repeats
+        ]
+        if repeated:
+            raise RepeatedQueriesError(
+                'Запросы повторяются больше {} раз:\n{}'.format(
+                    self.max_repeats, '\n'.join(repeated),
+                )
+            )
+
+    def connect(self):
+        """Включает проверку для всех соединений и запросов."""
+        for connection in connections.all():
+            connection.execute_wrappers.append(self)
+        request_started.connect(self.request_started)
+        request_finished.connect(self.request_finished)
+
+    def disconnect(self):
+        request_started.disconnect(self.request_started)
+        request_finished.disconnect(self.request_finished)
+        for connection in connections.all():
+            if self in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self)
+        self.shapes = None
@@ -0,0 +1,125 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import DatabaseError, connections
+from django.db.backends.signals import connection_created
+from django.urls import Resolver404, resolve
+from django.utils import timezone
+
+from .queries import fingerprint
+
+logger = logging.getLogger(__name__)
+
+SQL_MAX_LENGTH: int = 2000
+
+_state = threading.local()
+_write_lock = threading.Lock()
+
+
+def request_path_started(environ=None, **kwargs):
+    _state.path = (environ or {}).get('PATH_INFO')
+
+
+def request_path_finished(**kwargs):
+    _state.path = None
+
+
+def current_view():
+    """
+    Имя маршрута текущего запроса.
+
+    Путь запоминается по сигналу request_started и сбрасывается по
+    request_finished, который для потоковых ответов приходит после
+    выдачи содержимого. Маршрут определяется только для медленных
+    запросов.
+
+    :return: Имя маршрута или None вне HTTP-запроса и для 404.
+    """
+    path = getattr(_state, 'path', None)
+    if path is None:
+        return None
+    try:
+        return resolve(path).view_name
+    except Resolver404:
+        return None
+
+
+def explain(connection, sql, params) -> list:
+    """
+    Получает план запроса.
+
+    Используется отдельный курсор бэкенда: EXPLAIN не проходит через
+    execute_wrapper и не попадает в connection.queries.
+
+    :return: Строки плана или пустой список, если план получить нельзя.
+    """
+    prefix = connection.ops.explain_prefix
+    if not prefix or sql.lstrip()[:6].upper() != 'SELECT':
+        return []
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(f'{prefix} {sql}', params)
+        return [str(row[-1]) for row in cursor.fetchall()]
+    except DatabaseError:
+        logger.exception('Не удалось получить план запроса')
+        return []
+    finally:
+        cursor.close()
+
+
+def write_record(record):
+    """Дописывает запись в журнал, ошибки записи только логируются."""
+    path = settings.SLOW_QUERY_LOG
+    try:
+        with _write_lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as output:
+                output.write(json.dumps(record, ensure_ascii=False) + '\n')
+    except OSError:
+        logger.exception('Не удалось записать медленный запрос')
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    """
+    Записывает запросы дольше SLOW_QUERY_THRESHOLD_MS в SLOW_QUERY_LOG.
+
+    Каждая строка файла - JSON с длительностью, именем маршрута,
+    отпечатком и текстом запроса и планом EXPLAIN QUERY PLAN.
+    """
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = (time.perf_counter() - started) * 1000
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if threshold is None or duration < threshold:
+        return result
+    connection = context['connection']
+    write_record({
+        'time': timezone.now().isoformat(),
+        'duration_ms': round(duration, 3),
+        'alias': connection.alias,
+        'view': current_view(),
+        'fingerprint': fingerprint(sql),
+        'sql': sql[:SQL_MAX_LENGTH],
+        'params': None if many else [str(param) for param in params or ()],
+        'plan': [] if many else explain(connection, sql, params),
+    })
+    return result
+
+
+def add_slow_query_log(connection, **kwargs):
+    if slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_wrapper)
+
+
+def install():
+    """Подключает журнал медленных запросов ко всем соединениям."""
+    request_started.connect(request_path_started)
+    request_finished.connect(request_path_finished)
+    connection_created.connect(add_slow_query_log)
+    for connection in connections.all():
+        add_slow_query_log(connection)
@@ -0,0 +1,26 @@
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+from .queries import RepeatedQueryDetector
+
+
+class QueryCheckingRunner(DiscoverRunner):
+    """
+    Запускает тесты с проверкой N+1 в каждом запросе тестового клиента.
+
+    Тест падает с RepeatedQueriesError, если представление выполняет
+    запрос одной формы больше MAX_QUERY_REPEATS раз. Журнал медленных
+    запросов выключен: тесты журнала включают его сами.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.slow_query_log = override_settings(SLOW_QUERY_THRESHOLD_MS=None)
+        self.slow_query_log.enable()
+        self.query_detector = RepeatedQueryDetector()
+        self.query_detector.connect()
+
+    def teardown_test_environment(self, **kwargs):
+        self.query_detector.disconnect()
+        self.slow_query_log.disable()
+        super().teardown_test_environment(**kwargs)
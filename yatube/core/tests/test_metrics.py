@@ -0,0 +1,119 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..metrics import REGISTRY, Counter, Histogram, MetricsRegistry
+
+User = get_user_model()
+METRICS_TOKEN = 'metrics-token'
+
+
+@override_settings(METRICS_TOKEN=METRICS_TOKEN)
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def dead_pid(self):
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        return process.pid
+
+    def test_processes_aggregated(self):
+        """Значения процессов складываются при выдаче"""
+        registries = [
+            MetricsRegistry(self.directory), MetricsRegistry(self.directory),
+        ]
+        for registry in registries:
+            counter = Counter('test_total', 'Счетчик.', ('kind',),
+                              registry=registry)
+            histogram = Histogram('test_seconds', 'Время.',
+                                  buckets=(0.1, 1), registry=registry)
+            counter.inc(kind='a')
+            histogram.observe(0.5)
+            registry.flush()
+            if registry is registries[1]:
+                # Файл другого процесса.
+                os.replace(
+                    registry.path(),
+                    os.path.join(self.directory, f'{os.getppid()}.json'),
+                )
+        exposition = registries[0].exposition()
+        self.assertIn('test_total{kind="a"} 2', exposition)
+        self.assertIn('test_seconds_bucket{le="0.1"} 0', exposition)
+        self.assertIn('test_seconds_bucket{le="1"} 2', exposition)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 2', exposition)
+        self.assertIn('test_seconds_count 2', exposition)
+
+    def test_dead_processes_absorbed(self):
+        """Файл завершившегося процесса забирается без потери значений"""
+        dead = MetricsRegistry(self.directory)
+        Counter('test_total', 'Счетчик.', registry=dead).inc(3)
+        dead.flush()
+        dead_path = os.path.join(self.directory, f'{self.dead_pid()}.json')
+        os.replace(dead.path(), dead_path)
+        registry = MetricsRegistry(self.directory)
+        Counter('test_total', 'Счетчик.', registry=registry).inc()
+        self.assertIn('test_total 4', registry.exposition())
+        self.assertFalse(os.path.exists(dead_path), 'Файл процесса остался')
+        self.assertEqual(
+            os.listdir(self.directory), [f'{registry.pid}.json'],
+        )
+        self.assertIn('test_total 4', registry.exposition())
+
+    def test_not_shared_without_wsgi(self):
+        """Тесты и команды не пишут метрики в общий каталог"""
+        self.client.get(reverse('posts:index'))
+        REGISTRY.flush()
+        self.assertIsNone(REGISTRY.path())
+
+    def test_metrics_endpoint(self):
+        """Эндпоинт отдает метрики представлений, кеша и базы"""
+        cache.clear()
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION=f'Bearer {METRICS_TOKEN}',
+        )
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        content = response.content.decode()
+        for line in (
+            'yatube_http_requests_total{view="posts:index",method="GET",'
+            'status="200"}',
+            'yatube_http_request_duration_seconds_bucket{view="posts:index"',
+            'yatube_cache_requests_total{backend="LocMemCache",'
+            'result="miss"}',
+            'yatube_db_query_duration_seconds_count{alias="default",'
+            'operation="SELECT"}',
+        ):
+            self.assertIn(line, content)
+
+    def test_metrics_staff(self):
+        """Сотрудники видят метрики без токена"""
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_metrics_protected(self):
+        """Без токена метрики недоступны даже с локального адреса"""
+        for headers in (
+            {},
+            {'HTTP_AUTHORIZATION': 'Bearer wrong'},
+        ):
+            with self.subTest(headers=headers):
+                response = Client(REMOTE_ADDR='127.0.0.1').get(
+                    reverse('metrics'), **headers,
+                )
+                self.assertEqual(response.status_code, 404)
+        with override_settings(METRICS_TOKEN=None):
+            response = self.client.get(
+                reverse('metrics'), HTTP_AUTHORIZATION='Bearer None',
+            )
+            self.assertEqual(response.status_code, 404)
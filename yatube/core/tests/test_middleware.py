@@ -0,0 +1,39 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+class ServerTimingMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+    def test_server_timing(self):
+        """Профилируемый ответ содержит Server-Timing и строку лога"""
+        with self.assertLogs('core.middleware', 'INFO') as logs:
+            response = self.client.get(reverse('posts:index'))
+        metrics = {
+            entry.split(';')[0] for entry in
+            response['Server-Timing'].split(', ')
+        }
+        self.assertEqual(metrics, {'db', 'tpl', 'total'})
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['db_queries'], 0)
+        self.assertGreaterEqual(record['total_ms'], record['tpl_ms'])
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0.5)
+    def test_sampling(self):
+        """Запросы вне выборки не профилируются"""
+        with mock.patch('core.middleware.random.random', return_value=0.7):
+            response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_disabled_by_default(self):
+        """По умолчанию middleware выключено"""
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
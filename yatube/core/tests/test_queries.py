@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from ..queries import RepeatedQueriesError, RepeatedQueryDetector, fingerprint
+
+User = get_user_model()
+
+
+class RepeatedQueryDetectorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+
+    def test_fingerprint(self):
+        """Запросы, которые отличаются значениями, имеют один отпечаток"""
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 1 AND name = 'a''b'"),
+            fingerprint('SELECT * FROM t  WHERE id = 25 AND name = %s'),
+        )
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s)'),
+            'SELECT * FROM t WHERE id IN (...)',
+        )
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s)'),
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s)'),
+        )
+
+    def test_repeated_queries_fail(self):
+        """Повторение запроса одной формы сверх лимита - ошибка"""
+        detector = RepeatedQueryDetector(max_repeats=2)
+        with connection.execute_wrapper(detector):
+            detector.request_started()
+            for _ in range(3):
+                User.objects.get(pk=RepeatedQueryDetectorTests.user.pk)
+            with self.assertRaises(RepeatedQueriesError):
+                detector.request_finished()
+
+    def test_queries_outside_request_ignored(self):
+        """Запросы вне HTTP-запроса не считаются"""
+        detector = RepeatedQueryDetector(max_repeats=1)
+        with connection.execute_wrapper(detector):
+            for _ in range(3):
+                User.objects.get(pk=RepeatedQueryDetectorTests.user.pk)
+            detector.request_started()
+            User.objects.get(pk=RepeatedQueryDetectorTests.user.pk)
+            detector.request_finished()
@@ -0,0 +1,72 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..queries import fingerprint
+
+User = get_user_model()
+LOG_DIR = tempfile.mkdtemp()
+SLOW_QUERY_LOG = os.path.join(LOG_DIR, 'slow.jsonl')
+
+
+@override_settings(SLOW_QUERY_LOG=SLOW_QUERY_LOG)
+class SlowQueryLogTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(LOG_DIR, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(SlowQueryLogTests.user)
+        self.addCleanup(
+            lambda: os.path.exists(SLOW_QUERY_LOG) and os.remove(
+                SLOW_QUERY_LOG,
+            )
+        )
+
+    def read_log(self) -> list:
+        with open(SLOW_QUERY_LOG, encoding='utf-8') as lines:
+            return [json.loads(line) for line in lines]
+
+    def test_slow_queries_logged(self):
+        """Медленный запрос пишется с маршрутом, отпечатком и планом"""
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=0):
+            self.client.get(reverse('posts:likes_index'))
+        records = [
+            record for record in self.read_log()
+            if 'posts_like' in record['sql']
+        ]
+        self.assertTrue(records, 'Запрос лайков не записан')
+        record = records[0]
+        self.assertEqual(record['view'], 'posts:likes_index')
+        self.assertEqual(record['fingerprint'], fingerprint(record['sql']))
+        self.assertTrue(record['plan'], 'План запроса не получен')
+
+    def test_fast_queries_skipped(self):
+        """Запросы быстрее порога не записываются"""
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=10 ** 6):
+            self.client.get(reverse('posts:likes_index'))
+        self.assertFalse(os.path.exists(SLOW_QUERY_LOG))
+
+    def test_report(self):
+        """Команда группирует запросы по отпечаткам"""
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=0):
+            for _ in range(2):
+                self.client.get(reverse('posts:likes_index'))
+        stdout = StringIO()
+        call_command('slow_query_report', sort='count', stdout=stdout)
+        output = stdout.getvalue()
+        self.assertIn('posts:likes_index x2', output)
+        self.assertIn('Всего отпечатков', output)
@@ -1,4 +1,9 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+
+from .metrics import CONTENT_TYPE, REGISTRY
 
 
 def page_not_found(request, exception):
@@ -70,3 +75,25 @@ def permission_denied(request, exception):
         template_name='core/403.html',
         status=403,
     )
+
+
+def metrics(request):
+    """
+    Отдает метрики всех процессов в формате Prometheus.
+
+    Доступно сотрудникам и клиентам с заголовком
+    Authorization: Bearer <METRICS_TOKEN>, остальным отвечает 404.
+
+    Аргументы:
+    - request (HttpRequest): объект запроса
+
+    Возвращает:
+    - HttpResponse: метрики в текстовом формате
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    authorized = bool(token) and constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}',
+    )
+    if not (authorized or request.user.is_staff):
+        raise Http404
+    return HttpResponse(REGISTRY.exposition(), content_type=CONTENT_TYPE)
@@ -1,6 +1,8 @@
 from django.contrib import admin
 
 from .models import Comment, Follow, Group, Like, Post
+from .paginators import CachedCountPaginator
+from .search import matching_post_ids, search_available
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -12,8 +14,31 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ('text',)
     list_filter = ('pub_date',)
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    show_full_result_count = False
+    paginator = CachedCountPaginator
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет посты по полнотекстовому индексу вместо LIKE."""
+        if not search_term or not search_available():
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(pk__in=matching_post_ids(search_term)), False
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        """
+        Выбирает группы один раз для всей страницы.
+
+        Поле группы копируется в каждую строку списка, и без готового
+        списка вариантов каждая копия заново запрашивает все группы.
+        """
+        formfield = super().formfield_for_foreignkey(
+            db_field, request, **kwargs
+        )
+        if db_field.name == 'group':
+            formfield.choices = list(formfield.choices)
+        return formfield
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
@@ -0,0 +1,177 @@
+import math
+import time
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+
+from . import urls
+from .models import Follow, Group, Post
+
+BENCHMARK_PERCENTILES: tuple = (50, 90, 99)
+# Представления, которые меняют данные: замеры искажали бы набор данных
+# и результаты следующих запусков.
+SKIPPED_VIEWS: frozenset = frozenset((
+    'add_comment',
+    'profile_follow',
+    'profile_unfollow',
+    'post_like',
+    'post_unlike',
+))
+
+Case = namedtuple('Case', ('name', 'url', 'user'))
+Result = namedtuple(
+    'Result', ('case', 'status', 'timings', 'queries', 'size'),
+)
+
+User = get_user_model()
+
+
+def percentile(values, percent) -> float:
+    """
+    Перцентиль по методу ближайшего ранга.
+
+    :param values: Отсортированные значения.
+    :param percent: Перцентиль от 0 до 100.
+    """
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def view_names() -> list:
+    """Имена всех именованных маршрутов posts.urls."""
+    return [
+        pattern.name
+        for pattern in urls.urlpatterns
+        if isinstance(pattern, URLPattern) and pattern.name
+    ]
+
+
+def sample_objects() -> dict:
+    """
+    Выбирает самые нагруженные объекты для сценариев.
+
+    Самый плодовитый автор, самая большая группа, самый обсуждаемый пост
+    и пользователь с наибольшим числом подписок дают худший случай для
+    каждой страницы.
+
+    :return: Словарь объектов или None, если постов нет.
+    """
+    post = Post.objects.select_related('author').annotate(
+        comment_count=Count('comments'),
+    ).order_by('-comment_count', '-pk').first()
+    if post is None:
+        return None
+    author = User.objects.annotate(
+        post_count=Count('posts'),
+    ).order_by('-post_count', 'pk').first()
+    group = Group.objects.annotate(
+        post_count=Count('posts'),
+    ).order_by('-post_count', 'pk').first()
+    follower_id = Follow.objects.values('user').annotate(
+        total=Count('pk'),
+    ).order_by('-total').values_list('user', flat=True).first()
+    word = post.text.split()[0] if post.text.split() else 'a'
+    return {
+        'post': post,
+        'author': author,
+        'group': group,
+        'reader': User.objects.filter(pk=follower_id).first() or author,
+        'word': word,
+    }
+
+
+def build_cases(objects) -> list:
+    """
+    Составляет сценарии для всех представлений posts.urls.
+
+    :param objects: Результат sample_objects.
+    :return: Список Case. Представления без сценария в список не входят,
+        их показывает missing_views.
+    """
+    post, author, group = objects['post'], objects['author'], objects['group']
+    reader = objects['reader']
+    username = {'username': author.username}
+    cases = [
+        Case('index', reverse('posts:index'), None),
+        Case('index?page=2', reverse('posts:index') + '?page=2', None),
+        Case('profile', reverse('posts:profile', kwargs=username), None),
+        Case('post_detail', reverse(
+            'posts:post_detail', kwargs={'post_id': post.pk},
+        ), None),
+        Case('post_create', reverse('posts:post_create'), post.author),
+        Case('post_edit', reverse(
+            'posts:post_edit', kwargs={'post_id': post.pk},
+        ), post.author),
+        Case('search', reverse('posts:search') + f'?q={objects["word"]}',
+             None),
+        Case('follow_index', reverse('posts:follow_index'), reader),
+        Case('likes_index', reverse('posts:likes_index'), reader),
+        Case('index_feed', reverse(
+            'posts:index_feed', kwargs={'feed_format': 'atom'},
+        ), None),
+        Case('profile_feed', reverse(
+            'posts:profile_feed',
+            kwargs={'feed_format': 'rss', **username},
+        ), None),
+    ]
+    if group is not None:
+        cases += [
+            Case('group_list', reverse(
+                'posts:group_list', kwargs={'slug': group.slug},
+            ), None),
+            Case('group_feed', reverse(
+                'posts:group_feed',
+                kwargs={'slug': group.slug, 'feed_format': 'atom'},
+            ), None),
+        ]
+    return cases
+
+
+def missing_views(cases) -> list:
+    """Представления posts.urls без сценария и не пропущенные явно."""
+    covered = {case.name.split('?')[0] for case in cases} | SKIPPED_VIEWS
+    return [name for name in view_names() if name not in covered]
+
+
+def measure(case, requests, warmup=1, cold=False) -> Result:
+    """
+    Выполняет запросы одного сценария через тестовый клиент.
+
+    :param case: Сценарий.
+    :param requests: Количество замеряемых запросов.
+    :param warmup: Количество запросов до замеров.
+    :param cold: Очищать кеш перед каждым запросом.
+    :return: Result с отсортированными временами в миллисекундах,
+        средним числом запросов к базе и размером последнего ответа.
+    """
+    client = Client()
+    if case.user is not None:
+        client.force_login(case.user)
+    timings, queries = [], []
+    for number in range(warmup + requests):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(case.url)
+            body = (
+                b''.join(response.streaming_content)
+                if response.streaming else response.content
+            )
+            elapsed = time.perf_counter() - started
+        if number >= warmup:
+            timings.append(elapsed * 1000)
+            queries.append(len(captured.captured_queries))
+    return Result(
+        case=case,
+        status=response.status_code,
+        timings=sorted(timings),
+        queries=sum(queries) / len(queries),
+        size=len(body),
+    )
@@ -0,0 +1,281 @@
+import hashlib
+from datetime import datetime
+from functools import wraps
+
+from django.core.cache import cache
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+from django.views.decorators.http import condition
+
+from .kvstore import prefetch_thumbnails
+from .models import CacheVersion, Post
+
+PAGE_CACHE_TIMEOUT: int = 60 * 60 * 24
+PAGE_KEY_PREFIX: str = 'posts:page:'
+POSTS_SCOPE: str = 'posts'
+GROUP_SCOPE: str = 'group:{slug}'
+AUTHOR_SCOPE: str = 'author:{username}'
+POST_SCOPE: str = 'post:{post_id}'
+FEED_SCOPE: str = 'feed:{user_id}'
+LIKES_SCOPE: str = 'likes:{user_id}'
+# Версия областей без своей записи в CacheVersion.
+BASE_SCOPE: str = '*'
+BASE_VERSION: datetime = datetime(1970, 1, 1)
+CARD_CACHE_TIMEOUT: int = 60 * 60 * 24 * 7
+CARD_KEY_PREFIX: str = 'posts:card:'
+CARD_TEMPLATE: str = 'posts/includes/post_card_body.html'
+
+
+def post_list_scopes(post) -> list:
+    """
+    Перечисляет списки постов, в которые входит пост.
+
+    :param post: Пост, который изменился.
+    :return: Общая лента, профиль автора и группа.
+    """
+    scopes = [POSTS_SCOPE]
+    if post.author_id:
+        scopes.append(AUTHOR_SCOPE.format(username=post.author.username))
+    if post.group_id:
+        scopes.append(GROUP_SCOPE.format(slug=post.group.slug))
+    return scopes
+
+
+def post_scopes(post) -> list:
+    """
+    Перечисляет области кеша, которые отображают пост.
+
+    :param post: Пост, который изменился.
+    :return: Списки постов из post_list_scopes и страница поста.
+    """
+    return [*post_list_scopes(post), POST_SCOPE.format(post_id=post.pk)]
+
+
+def get_versions(*scopes) -> list:
+    """
+    Получает версии областей кеша.
+
+    Версия - момент последнего изменения области. Версии хранятся в
+    базе и общие для всех процессов. Чтение ничего не пишет: области без
+    записи получают базовую версию BASE_SCOPE, которую меняет
+    reset_versions, а записи создает только bump_versions.
+
+    :param scopes: Названия областей.
+    :return: Версии в порядке перечисления областей.
+    """
+    versions = dict(
+        CacheVersion.objects.filter(
+            scope__in=[*scopes, BASE_SCOPE],
+        ).values_list('scope', 'changed')
+    )
+    base = versions.get(BASE_SCOPE, BASE_VERSION)
+    return [versions.get(scope, base) for scope in scopes]
+
+
+def request_versions(request, scopes) -> list:
+    """
+    Получает версии областей один раз за запрос.
+
+    :param request: Объект запроса.
+    :param scopes: Названия областей.
+    """
+    if not hasattr(request, 'cache_versions'):
+        request.cache_versions = {}
+    key = tuple(scopes)
+    if key not in request.cache_versions:
+        request.cache_versions[key] = get_versions(*scopes)
+    return request.cache_versions[key]
+
+
+def bump_versions(*scopes):
+    """
+    Помечает области кеша как изменившиеся.
+
+    :param scopes: Названия областей.
+    """
+    scopes = set(scopes)
+    now = timezone.now()
+    CacheVersion.objects.bulk_create(
+        [CacheVersion(scope=scope, changed=now) for scope in scopes],
+        ignore_conflicts=True,
+    )
+    CacheVersion.objects.filter(scope__in=scopes).update(changed=now)
+
+
+def reset_versions():
+    """Сбрасывает версии всех областей, например после массовой загрузки."""
+    CacheVersion.objects.all().delete()
+    bump_versions(BASE_SCOPE)
+
+
+def resolve_scopes(scope_templates, kwargs) -> list:
+    """
+    Подставляет аргументы представления в шаблоны областей кеша.
+
+    :param scope_templates: Строки-шаблоны вида GROUP_SCOPE или функции,
+        которые принимают аргументы представления и возвращают список
+        областей.
+    :param kwargs: Именованные аргументы представления.
+    """
+    scopes = []
+    for template in scope_templates:
+        if callable(template):
+            scopes.extend(template(**kwargs))
+        else:
+            scopes.append(template.format(**kwargs))
+    return scopes
+
+
+def post_detail_scopes(post_id) -> list:
+    """
+    Перечисляет области кеша страницы поста.
+
+    Страница показывает количество постов автора, поэтому зависит и от
+    области автора.
+
+    :param post_id: Идентификатор поста.
+    """
+    scopes = [POST_SCOPE.format(post_id=post_id)]
+    username = Post.objects.filter(pk=post_id).values_list(
+        'author__username',
+        flat=True,
+    ).first()
+    if username is not None:
+        scopes.append(AUTHOR_SCOPE.format(username=username))
+    return scopes
+
+
+def page_fingerprint(request, versions) -> str:
+    """
+    Строит отпечаток страницы для конкретного пользователя.
+
+    :param request: Объект запроса.
+    :param versions: Версии областей, от которых зависит страница.
+    """
+    raw = '|'.join(
+        [request.get_full_path(), str(request.user.pk)]
+        + [repr(version) for version in versions]
+    )
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def cache_versioned_page(*scope_templates, timeout=PAGE_CACHE_TIMEOUT):
+    """
+    Кеширует страницу до изменения ее данных.
+
+    Ключ страницы содержит версии областей, поэтому запись перестает
+    использоваться сразу после изменения постов, и ее можно хранить
+    долго. Сами страницы лежат в кеше процесса, а версии - в базе,
+    поэтому изменение в любом процессе сбрасывает страницы во всех.
+    Страницы кешируются отдельно для каждого пользователя.
+
+    :param scope_templates: Шаблоны областей, см. resolve_scopes.
+    :param timeout: Время жизни записи в секундах.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            versions = request_versions(
+                request, resolve_scopes(scope_templates, kwargs),
+            )
+            key = PAGE_KEY_PREFIX + page_fingerprint(request, versions)
+            response = cache.get(key)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+                if response.status_code == 200 and not response.cookies:
+                    cache.set(key, response, timeout)
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_page(*scope_templates):
+    """
+    Отвечает 304 Not Modified, если страница у клиента не устарела.
+
+    Версии областей меняются при публикации и изменении постов, новых
+    комментариях и лайках, поэтому служат валидатором: ETag - отпечаток
+    версий и пользователя. Last-Modified не отдается: у HTTP-даты
+    точность в секунду, и изменение в ту же секунду, что и прошлый
+    ответ, дало бы устаревший 304. Версии читаются одним запросом из
+    общей таблицы, поэтому все процессы отдают одинаковые валидаторы, а
+    тяжелые выборки постов не выполняются.
+
+    :param scope_templates: Шаблоны областей, см. resolve_scopes.
+    """
+    def etag(request, *args, **kwargs):
+        versions = request_versions(
+            request, resolve_scopes(scope_templates, kwargs),
+        )
+        return page_fingerprint(request, versions)
+
+    return condition(etag_func=etag)
+
+
+def card_cache_key(post) -> str:
+    """
+    Строит ключ кеша отрисованной карточки поста.
+
+    Ключ содержит отпечаток всех отображаемых в карточке данных,
+    поэтому изменение поста или имени автора дает новый ключ.
+
+    :param post: Пост с загруженным автором.
+    """
+    stamp = '|'.join((
+        str(post.pub_date),
+        str(post.group_id),
+        post.image.name,
+        post.author.username,
+        post.author.get_full_name(),
+        post.text,
+    ))
+    digest = hashlib.md5(stamp.encode()).hexdigest()
+    return f'{CARD_KEY_PREFIX}{post.pk}:{digest}'
+
+
+def attach_cached_cards(posts):
+    """
+    Прикрепляет к постам отрисованные карточки из кеша.
+
+    Карточки читаются одним get_many, недостающие отрисовываются и
+    сохраняются одним set_many. Варианты изображений подгружаются только
+    для отрисовываемых карточек. Карточка, чьи варианты еще не готовы,
+    выводит миниатюру sorl и не кешируется, чтобы после обработки
+    изображения показать варианты. Метаданные таких миниатюр читаются
+    из хранилища sorl одним запросом.
+
+    :param posts: Посты страницы.
+    """
+    posts_by_key = {card_cache_key(post): post for post in posts}
+    cards = cache.get_many(posts_by_key)
+    missing_posts = {
+        key: post for key, post in posts_by_key.items() if key not in cards
+    }
+    prefetch_related_objects(
+        [post for post in missing_posts.values() if post.image],
+        'image_variants',
+    )
+    fallback_images = [
+        post.image
+        for post in missing_posts.values()
+        if post.image and not post.picture
+    ]
+    with prefetch_thumbnails(fallback_images):
+        missing = {
+            key: render_to_string(CARD_TEMPLATE, {'post': post})
+            for key, post in missing_posts.items()
+        }
+    cards.update(missing)
+    ready = {
+        key: card
+        for key, card in missing.items()
+        if not missing_posts[key].image or missing_posts[key].picture
+    }
+    if ready:
+        cache.set_many(ready, CARD_CACHE_TIMEOUT)
+    for key, post in posts_by_key.items():
+        post.cached_card = mark_safe(cards[key])
@@ -0,0 +1,123 @@
+import gzip
+import json
+import os
+from collections import namedtuple
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Follow, Group, Like, Post
+
+EXPORT_CHUNK_SIZE: int = 2000
+
+ExportSpec = namedtuple('ExportSpec', 'model fields date_field')
+
+# Связи выгружаются естественными ключами (имя пользователя, slug
+# группы), чтобы файлы можно было загрузить в другую базу.
+EXPORT_SPECS: dict = {
+    'group': ExportSpec(
+        Group,
+        {'slug': 'slug', 'title': 'title', 'description': 'description'},
+        None,
+    ),
+    'post': ExportSpec(
+        Post,
+        {
+            'id': 'pk',
+            'text': 'text',
+            'pub_date': 'pub_date',
+            'author': 'author__username',
+            'group': 'group__slug',
+            'image': 'image',
+            'like_count': 'like_count',
+        },
+        'pub_date',
+    ),
+    'comment': ExportSpec(
+        Comment,
+        {
+            'id': 'pk',
+            'post': 'post_id',
+            'author': 'author__username',
+            'text': 'text',
+            'created': 'created',
+        },
+        'created',
+    ),
+    'like': ExportSpec(
+        Like,
+        {
+            'user': 'user__username',
+            'app_label': 'content_type__app_label',
+            'model': 'content_type__model',
+            'object_id': 'object_id',
+        },
+        None,
+    ),
+    'follow': ExportSpec(
+        Follow,
+        {'user': 'user__username', 'author': 'author__username'},
+        None,
+    ),
+}
+
+
+def iter_records(spec, since=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Читает записи модели порциями по первичному ключу.
+
+    Каждая порция - отдельный запрос pk > последний, поэтому память не
+    зависит от размера таблицы.
+
+    :param spec: Описание выгрузки модели.
+    :param since: Выгружать только объекты, созданные не раньше этой даты.
+        Модели без даты выгружаются целиком.
+    :param chunk_size: Количество строк в одном запросе.
+    :return: Генератор словарей.
+    """
+    queryset = spec.model.objects.order_by('pk')
+    if since is not None and spec.date_field is not None:
+        queryset = queryset.filter(**{f'{spec.date_field}__gte': since})
+    names = list(spec.fields)
+    rows = queryset.values_list('pk', *spec.fields.values())
+    last_pk = 0
+    while True:
+        chunk = list(rows.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            return
+        last_pk = chunk[-1][0]
+        for row in chunk:
+            yield dict(zip(names, row[1:]))
+
+
+def export_path(directory, name, compress=False) -> str:
+    extension = '.ndjson.gz' if compress else '.ndjson'
+    return os.path.join(directory, name + extension)
+
+
+def export_model(name, directory, since=None, compress=False,
+                 chunk_size=EXPORT_CHUNK_SIZE) -> int:
+    """
+    Выгружает модель в файл NDJSON.
+
+    Файл пишется под временным именем и переименовывается после
+    завершения, поэтому недописанная выгрузка не видна читателям.
+
+    :param name: Ключ модели из EXPORT_SPECS.
+    :param directory: Каталог для файлов.
+    :param since: Дата для инкрементальной выгрузки.
+    :param compress: Сжимать файл gzip.
+    :param chunk_size: Количество строк в одном запросе.
+    :return: Количество выгруженных записей.
+    """
+    path = export_path(directory, name, compress)
+    opener = gzip.open if compress else open
+    count = 0
+    with opener(path + '.tmp', 'wt', encoding='utf-8') as output:
+        for record in iter_records(EXPORT_SPECS[name], since, chunk_size):
+            output.write(json.dumps(
+                record, cls=DjangoJSONEncoder, ensure_ascii=False,
+            ))
+            output.write('\n')
+            count += 1
+    os.replace(path + '.tmp', path)
+    return count
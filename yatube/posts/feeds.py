@@ -0,0 +1,245 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.db.models import Max
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import rfc2822_date, rfc3339_date
+from django.utils.text import Truncator
+from django.utils.xmlutils import SimplerXMLGenerator
+from django.views.decorators.http import condition
+
+from .models import Group, Post
+
+FEED_SIZE: int = 50
+FEED_TITLE_WORDS: int = 10
+FEED_CONTENT_TYPES: dict = {
+    'rss': 'application/rss+xml; charset=utf-8',
+    'atom': 'application/atom+xml; charset=utf-8',
+}
+ATOM_NAMESPACE: str = 'http://www.w3.org/2005/Atom'
+
+User = get_user_model()
+
+
+def feed_posts(posts):
+    """
+    Ограничивает посты ленты нужными колонками и количеством.
+
+    Колонка группы нужна ленте группы: менеджер group.posts проставляет
+    группу каждому посту и без колонки дозапрашивал бы ее по одному.
+
+    :param posts: Посты ленты.
+    """
+    return posts.select_related('author').only(
+        'pk', 'text', 'pub_date', 'group_id', 'author__username',
+    ).order_by('-pub_date')[:FEED_SIZE]
+
+
+def latest_pub_date(request, posts):
+    """
+    Получает дату последней публикации ленты одним запросом по индексу.
+
+    Значение запоминается в запросе: его использует и проверка
+    If-Modified-Since, и сама лента.
+
+    :param request: Объект запроса.
+    :param posts: Посты ленты.
+    """
+    if not hasattr(request, 'feed_updated'):
+        request.feed_updated = posts.aggregate(
+            updated=Max('pub_date'),
+        )['updated']
+    return request.feed_updated
+
+
+def take(buffer) -> str:
+    """Забирает накопленный текст из буфера и очищает его."""
+    try:
+        return buffer.getvalue()
+    finally:
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def entry_data(request, post) -> dict:
+    return {
+        'title': Truncator(post.text).words(FEED_TITLE_WORDS),
+        'link': request.build_absolute_uri(
+            reverse('posts:post_detail', args=(post.pk,))
+        ),
+        'author': post.author.username,
+        'text': post.text,
+        'date': post.pub_date,
+    }
+
+
+def stream_rss(request, title, link, posts, updated):
+    """
+    Выводит ленту RSS 2.0 по одному элементу.
+
+    :param request: Объект запроса.
+    :param title: Название ленты.
+    :param link: Абсолютный адрес страницы, которую повторяет лента.
+    :param posts: Посты ленты, читаются через iterator().
+    :param updated: Дата последней публикации.
+    """
+    buffer = StringIO()
+    handler = SimplerXMLGenerator(buffer, 'utf-8')
+    handler.startDocument()
+    handler.startElement('rss', {'version': '2.0'})
+    handler.startElement('channel', {})
+    handler.addQuickElement('title', title)
+    handler.addQuickElement('link', link)
+    handler.addQuickElement('description', title)
+    handler.addQuickElement('language', 'ru')
+    if updated is not None:
+        handler.addQuickElement('lastBuildDate', rfc2822_date(updated))
+    yield take(buffer)
+    for post in posts.iterator():
+        entry = entry_data(request, post)
+        handler.startElement('item', {})
+        handler.addQuickElement('title', entry['title'])
+        handler.addQuickElement('link', entry['link'])
+        handler.addQuickElement('guid', entry['link'])
+        handler.addQuickElement('pubDate', rfc2822_date(entry['date']))
+        handler.addQuickElement('author', entry['author'])
+        handler.addQuickElement('description', entry['text'])
+        handler.endElement('item')
+        yield take(buffer)
+    handler.endElement('channel')
+    handler.endElement('rss')
+    yield take(buffer)
+
+
+def stream_atom(request, title, link, posts, updated):
+    """
+    Выводит ленту Atom по одной записи.
+
+    :param request: Объект запроса.
+    :param title: Название ленты.
+    :param link: Абсолютный адрес страницы, которую повторяет лента.
+    :param posts: Посты ленты, читаются через iterator().
+    :param updated: Дата последней публикации.
+    """
+    buffer = StringIO()
+    handler = SimplerXMLGenerator(buffer, 'utf-8')
+    handler.startDocument()
+    handler.startElement('feed', {'xmlns': ATOM_NAMESPACE, 'xml:lang': 'ru'})
+    handler.addQuickElement('title', title)
+    handler.addQuickElement('link', '', {'rel': 'alternate', 'href': link})
+    handler.addQuickElement(
+        'link', '',
+        {'rel': 'self', 'href': request.build_absolute_uri()},
+    )
+    handler.addQuickElement('id', link)
+    if updated is not None:
+        handler.addQuickElement('updated', rfc3339_date(updated))
+    yield take(buffer)
+    for post in posts.iterator():
+        entry = entry_data(request, post)
+        handler.startElement('entry', {})
+        handler.addQuickElement('title', entry['title'])
+        handler.addQuickElement(
+            'link', '', {'rel': 'alternate', 'href': entry['link']},
+        )
+        handler.addQuickElement('id', entry['link'])
+        handler.addQuickElement('updated', rfc3339_date(entry['date']))
+        handler.startElement('author', {})
+        handler.addQuickElement('name', entry['author'])
+        handler.endElement('author')
+        handler.addQuickElement('summary', entry['text'], {'type': 'text'})
+        handler.endElement('entry')
+        yield take(buffer)
+    handler.endElement('feed')
+    yield take(buffer)
+
+
+FEED_WRITERS: dict = {
+    'rss': stream_rss,
+    'atom': stream_atom,
+}
+
+
+def feed_response(request, feed_format, title, page_url, posts):
+    """
+    Отдает ленту потоком, не собирая ее целиком в памяти.
+
+    Аргументы:
+    - request (HttpRequest): объект запроса
+    - feed_format (str): rss или atom
+    - title (str): название ленты
+    - page_url (str): адрес HTML-страницы ленты
+    - posts (QuerySet): посты ленты
+
+    Возвращает:
+    - StreamingHttpResponse: лента
+    """
+    writer = FEED_WRITERS[feed_format]
+    updated = latest_pub_date(request, posts)
+    return StreamingHttpResponse(
+        writer(
+            request,
+            title,
+            request.build_absolute_uri(page_url),
+            feed_posts(posts),
+            updated,
+        ),
+        content_type=FEED_CONTENT_TYPES[feed_format],
+    )
+
+
+def feed_view(get_feed):
+    """
+    Превращает описание ленты в представление с поддержкой 304.
+
+    :param get_feed: Функция, которая по аргументам URL возвращает
+        название ленты, адрес HTML-страницы и посты.
+    """
+    def last_modified(request, feed_format, **kwargs):
+        return latest_pub_date(request, request.feed[2])
+
+    @condition(last_modified_func=last_modified)
+    def view(request, feed_format, **kwargs):
+        title, page_url, posts = request.feed
+        return feed_response(request, feed_format, title, page_url, posts)
+
+    def dispatch(request, feed_format, **kwargs):
+        if feed_format not in FEED_WRITERS:
+            raise Http404('Неизвестный формат ленты')
+        request.feed = get_feed(**kwargs)
+        return view(request, feed_format, **kwargs)
+
+    return dispatch
+
+
+def index_feed_data():
+    return (
+        'Последние обновления на сайте',
+        reverse('posts:index'),
+        Post.objects.all(),
+    )
+
+
+def group_feed_data(slug):
+    group = get_object_or_404(Group, slug=slug)
+    return (
+        f'Записи сообщества {group.title}',
+        reverse('posts:group_list', args=(slug,)),
+        group.posts.all(),
+    )
+
+
+def profile_feed_data(username):
+    author = get_object_or_404(User, username=username)
+    return (
+        f'Записи пользователя {author.username}',
+        reverse('posts:profile', args=(username,)),
+        author.posts.all(),
+    )
+
+
+index_feed = feed_view(index_feed_data)
+group_feed = feed_view(group_feed_data)
+profile_feed = feed_view(profile_feed_data)
@@ -1,6 +1,8 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
 from .models import Comment, Post
+from .uploads import prepare_image
 
 
 class PostForm(ModelForm):
@@ -15,6 +17,13 @@ class PostForm(ModelForm):
             'group': 'Можете указать тематику поста или оставить поле пустым'
         }
 
+    def clean_image(self):
+        """Проверяет лимиты нового изображения и уменьшает его."""
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return prepare_image(image)
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
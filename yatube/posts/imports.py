@@ -0,0 +1,308 @@
+import csv
+import gzip
+import json
+import os
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .cache import reset_versions
+from .models import Comment, Follow, Group, Like, Post
+from .search import search_available
+
+IMPORT_BATCH_SIZE: int = 1000
+# Порядок загрузки: сначала модели, на которые ссылаются остальные.
+IMPORT_MODELS: dict = {
+    'group': Group,
+    'post': Post,
+    'comment': Comment,
+    'like': Like,
+    'follow': Follow,
+}
+# Поля, по которым узнаются уже загруженные записи без уникальных полей.
+# В базе записи ищутся по значениям первого поля и диапазону второго.
+NATURAL_KEYS: dict = {
+    'post': ('author_id', 'pub_date', 'text'),
+    'comment': ('author_id', 'created', 'post_id', 'text'),
+}
+USER_KEYS: dict = {
+    'group': (),
+    'post': ('author',),
+    'comment': ('author',),
+    'like': ('user',),
+    'follow': ('user', 'author'),
+}
+
+User = get_user_model()
+
+
+def model_name(path) -> str:
+    """
+    Определяет модель по имени файла: post.ndjson.gz, group.csv и т.п.
+
+    :param path: Путь к файлу.
+    """
+    return os.path.basename(path).split('.')[0]
+
+
+def read_records(path):
+    """
+    Читает записи из файла NDJSON или CSV, сжатого gzip или нет.
+
+    :param path: Путь к файлу. Формат определяется по расширению.
+    :return: Генератор словарей.
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', newline='') as lines:
+        if '.csv' in os.path.basename(path):
+            for row in csv.DictReader(lines):
+                yield {key: value or None for key, value in row.items()}
+        else:
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def batches(records, size):
+    records = iter(records)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+def to_datetime(value):
+    return parse_datetime(value) if isinstance(value, str) else value
+
+
+def to_int(value):
+    return int(value) if value not in (None, '') else None
+
+
+def natural_key(obj, fields) -> tuple:
+    return tuple(getattr(obj, field) for field in fields)
+
+
+def rebuild_derived_data(stdout=None):
+    """
+    Восстанавливает данные, которые обычно ведут сигналы.
+
+    Нужна после bulk_create, который сигналы не отправляет: пересобирает
+    ленты, счетчики и поисковый индекс и сбрасывает версии кеша, чтобы
+    процессы сервера не отдавали страницы без загруженных записей.
+
+    :param stdout: Поток для вывода команд.
+    """
+    for command in ('rebuild_timelines', 'recount_likes', 'recount_follows'):
+        call_command(command, stdout=stdout)
+    if search_available():
+        call_command('rebuild_search_index', stdout=stdout)
+    reset_versions()
+
+
+@contextmanager
+def preserve_auto_now_add(model):
+    """
+    Отключает auto_now_add, чтобы bulk_create сохранил даты из файла.
+
+    :param model: Модель, поля которой временно перестают
+        подставлять текущее время.
+    """
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    """
+    Загрузчик записей пачками через bulk_create.
+
+    Пользователи, группы и типы содержимого ищутся по словарям в
+    памяти. Неизвестные пользователи создаются с неиспользуемым паролем.
+    Посты и комментарии получают новые id: id из файла служат только
+    ключами словарей в памяти, по которым находятся ссылки комментариев
+    и лайков. Записи со ссылками на объекты, которых нет в загрузке,
+    пропускаются. Каждая пачка пишется в своей транзакции, уже
+    существующие записи пропускаются, поэтому загрузку можно повторять.
+
+    :param batch_size: Количество записей в одной пачке.
+    """
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.content_types = {}
+        self.ids = {name: {} for name in NATURAL_KEYS}
+
+    def resolve_users(self, usernames):
+        """
+        Добавляет в словарь пользователей недостающие имена.
+
+        :param usernames: Имена пользователей пачки.
+        """
+        missing = {name for name in usernames if name not in self.users}
+        if not missing:
+            return
+        password = make_password(None)
+        User.objects.bulk_create(
+            [User(username=name, password=password) for name in missing],
+            ignore_conflicts=True,
+        )
+        self.users.update(
+            User.objects.filter(username__in=missing).values_list(
+                'username', 'pk',
+            )
+        )
+
+    def content_type_id(self, app_label, model):
+        key = (app_label, model)
+        if key not in self.content_types:
+            self.content_types[key] = ContentType.objects.get_by_natural_key(
+                app_label, model,
+            ).pk
+        return self.content_types[key]
+
+    def build_group(self, record):
+        return Group(
+            slug=record['slug'],
+            title=record['title'],
+            description=record.get('description') or '',
+        )
+
+    def build_post(self, record):
+        return Post(
+            text=record['text'],
+            pub_date=to_datetime(record['pub_date']),
+            author_id=self.users[record['author']],
+            group_id=self.groups.get(record.get('group')),
+            image=record.get('image') or '',
+        )
+
+    def build_comment(self, record):
+        post_id = self.ids['post'].get(to_int(record['post']))
+        if post_id is None:
+            return None
+        return Comment(
+            post_id=post_id,
+            author_id=self.users[record['author']],
+            text=record['text'],
+            created=to_datetime(record['created']),
+        )
+
+    def build_like(self, record):
+        object_id = self.ids.get(record['model'], {}).get(
+            to_int(record['object_id']),
+        )
+        if object_id is None:
+            return None
+        return Like(
+            user_id=self.users[record['user']],
+            content_type_id=self.content_type_id(
+                record['app_label'], record['model'],
+            ),
+            object_id=object_id,
+        )
+
+    def build_follow(self, record):
+        return Follow(
+            user_id=self.users[record['user']],
+            author_id=self.users[record['author']],
+        )
+
+    def find_existing(self, name, objects) -> dict:
+        """
+        Находит в базе записи с теми же естественными ключами.
+
+        :param name: Ключ модели из NATURAL_KEYS.
+        :param objects: Несохраненные записи пачки.
+        :return: Словарь {естественный ключ: id}.
+        """
+        if not objects:
+            return {}
+        fields = NATURAL_KEYS[name]
+        dates = [getattr(obj, fields[1]) for obj in objects]
+        rows = IMPORT_MODELS[name].objects.filter(**{
+            f'{fields[0]}__in': {getattr(obj, fields[0]) for obj in objects},
+            f'{fields[1]}__range': (min(dates), max(dates)),
+        }).values_list(*fields, 'pk')
+        return {tuple(row[:-1]): row[-1] for row in rows}
+
+    def save_new(self, name, records, objects):
+        """
+        Создает записи, которых еще нет в базе, и запоминает их новые id
+        под id из файла.
+
+        :param name: Ключ модели из NATURAL_KEYS.
+        :param records: Словари пачки.
+        :param objects: Записи, построенные по словарям.
+        """
+        fields = NATURAL_KEYS[name]
+        existing = self.find_existing(name, objects)
+        new = {}
+        for obj in objects:
+            key = natural_key(obj, fields)
+            if key not in existing:
+                new.setdefault(key, obj)
+        if new:
+            IMPORT_MODELS[name].objects.bulk_create(new.values())
+            existing = self.find_existing(name, objects)
+        for record, obj in zip(records, objects):
+            source_id = to_int(record.get('id'))
+            if source_id is not None:
+                self.ids[name][source_id] = existing[
+                    natural_key(obj, fields)
+                ]
+
+    def import_records(self, name, records) -> int:
+        """
+        Загружает записи одной модели.
+
+        :param name: Ключ модели из IMPORT_MODELS.
+        :param records: Словари в формате export_ndjson.
+        :return: Количество записей без пропущенных.
+        """
+        build = getattr(self, f'build_{name}')
+        model = IMPORT_MODELS[name]
+        count = 0
+        with preserve_auto_now_add(model):
+            for batch in batches(records, self.batch_size):
+                self.resolve_users(
+                    record[key]
+                    for record in batch
+                    for key in USER_KEYS[name]
+                )
+                kept, objects = [], []
+                for record in batch:
+                    obj = build(record)
+                    if obj is not None:
+                        kept.append(record)
+                        objects.append(obj)
+                # Размер INSERT выбирает бэкенд: в Django 2.2 явный
+                # batch_size не ограничивается лимитами SQLite.
+                with transaction.atomic():
+                    if name in NATURAL_KEYS:
+                        self.save_new(name, kept, objects)
+                    else:
+                        model.objects.bulk_create(
+                            objects, ignore_conflicts=True,
+                        )
+                count += len(objects)
+        if name == 'group':
+            self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        return count
@@ -0,0 +1,141 @@
+import threading
+from contextlib import contextmanager, nullcontext
+
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import KVStoreBase, add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+# Размеры и параметры должны совпадать с тегами thumbnail в шаблонах,
+# иначе подготовленные миниатюры не найдутся по ключу.
+THUMBNAIL_GEOMETRIES: tuple = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+
+class KVStore(KVStoreBase):
+    """
+    Хранилище метаданных миниатюр в базе с пакетной предзагрузкой.
+
+    Значения читаются прямо из таблицы sorl без промежуточного кеша:
+    таблица общая для всех процессов, а в тестах создается в тестовой
+    базе. Ключи всех миниатюр страницы читаются одним запросом, и пока
+    действует prefetch, теги thumbnail получают значения из памяти
+    потока.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._local = threading.local()
+
+    def _prefetched(self):
+        return getattr(self._local, 'values', None)
+
+    def load_many(self, keys) -> dict:
+        """
+        Читает значения ключей из базы.
+
+        :param keys: Ключи с префиксами sorl.
+        :return: Словарь ключ - значение, отсутствующие равны None.
+        """
+        if not keys:
+            return {}
+        found = dict(
+            KVStoreModel.objects.filter(key__in=keys).values_list(
+                'key', 'value',
+            )
+        )
+        return {key: found.get(key) for key in keys}
+
+    @contextmanager
+    def prefetch(self, keys):
+        """
+        Загружает ключи заранее на время блока.
+
+        :param keys: Ключи с префиксами sorl.
+        """
+        previous = self._prefetched()
+        self._local.values = {**(previous or {}), **self.load_many(keys)}
+        try:
+            yield
+        finally:
+            self._local.values = previous
+
+    def clear(self, delete_thumbnails=False):
+        KVStoreModel.objects.filter(
+            key__startswith=settings.THUMBNAIL_KEY_PREFIX,
+        ).delete()
+        if delete_thumbnails:
+            self.delete_all_thumbnail_files()
+
+    def _get_raw(self, key):
+        prefetched = self._prefetched()
+        if prefetched is not None and key in prefetched:
+            return prefetched[key]
+        return KVStoreModel.objects.filter(key=key).values_list(
+            'value', flat=True,
+        ).first()
+
+    def _set_raw(self, key, value):
+        KVStoreModel.objects.update_or_create(
+            key=key, defaults={'value': value},
+        )
+        prefetched = self._prefetched()
+        if prefetched is not None:
+            prefetched[key] = value
+
+    def _delete_raw(self, *keys):
+        KVStoreModel.objects.filter(key__in=keys).delete()
+        prefetched = self._prefetched()
+        if prefetched is not None:
+            for key in keys:
+                prefetched.pop(key, None)
+
+    def _find_keys_raw(self, prefix):
+        return KVStoreModel.objects.filter(
+            key__startswith=prefix,
+        ).values_list('key', flat=True)
+
+
+def thumbnail_key(image, geometry, options) -> str:
+    """
+    Вычисляет ключ миниатюры так же, как sorl при выводе тега.
+
+    :param image: Изображение или его имя в хранилище.
+    :param geometry: Строка размеров, например '960x339'.
+    :param options: Параметры тега thumbnail.
+    :return: Ключ миниатюры в хранилище метаданных.
+    """
+    backend = default.backend
+    source = ImageFile(image)
+    options = dict(options)
+    if settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return add_prefix(ImageFile(name, default.storage).key)
+
+
+def prefetch_thumbnails(images):
+    """
+    Загружает метаданные всех миниатюр изображений одним запросом.
+
+    Если в THUMBNAIL_KVSTORE указано другое хранилище, ничего не делает.
+
+    :param images: Изображения постов.
+    :return: Контекстный менеджер, внутри которого действует предзагрузка.
+    """
+    if not hasattr(default.kvstore, 'prefetch'):
+        return nullcontext()
+    return default.kvstore.prefetch([
+        thumbnail_key(image, geometry, options)
+        for image in images
+        for geometry, options in THUMBNAIL_GEOMETRIES
+    ])
@@ -0,0 +1,85 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from posts.benchmarks import (BENCHMARK_PERCENTILES, build_cases, measure,
+                              missing_views, percentile, sample_objects)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет представления posts.urls через тестовый клиент: '
+        'перцентили времени ответа, число запросов к базе и размер ответа.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Количество замеряемых запросов на представление.',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=1,
+            help='Количество запросов до замеров.',
+        )
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Очищать кеш перед каждым запросом.',
+        )
+        parser.add_argument(
+            '--views',
+            nargs='+',
+            help='Замерять только эти сценарии, например index post_detail.',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Выводить результаты строками JSON для сравнения.',
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('Нужен хотя бы один запрос.')
+        objects = sample_objects()
+        if objects is None:
+            raise CommandError('В базе нет постов, выполните seed_data.')
+        cases = build_cases(objects)
+        for name in missing_views(cases):
+            self.stderr.write(f'Нет сценария для представления {name}')
+        if options['views']:
+            cases = [case for case in cases if case.name in options['views']]
+        if not options['json']:
+            self.stdout.write(
+                f'{"сценарий":<16}{"код":>5}'
+                + ''.join(f'{f"p{p}, мс":>11}' for p in BENCHMARK_PERCENTILES)
+                + f'{"запросов":>10}{"байт":>10}'
+            )
+        for case in cases:
+            result = measure(
+                case, options['requests'], options['warmup'], options['cold'],
+            )
+            self.report(result, options['json'])
+
+    def report(self, result, as_json):
+        percentiles = {
+            f'p{p}': round(percentile(result.timings, p), 2)
+            for p in BENCHMARK_PERCENTILES
+        }
+        if as_json:
+            self.stdout.write(json.dumps({
+                'view': result.case.name,
+                'url': result.case.url,
+                'status': result.status,
+                **percentiles,
+                'queries': result.queries,
+                'bytes': result.size,
+            }))
+            return
+        self.stdout.write(
+            f'{result.case.name:<16}{result.status:>5}'
+            + ''.join(f'{value:>11.1f}' for value in percentiles.values())
+            + f'{result.queries:>10.1f}{result.size:>10}'
+        )
@@ -0,0 +1,71 @@
+import os
+import time
+from datetime import datetime
+from functools import partial
+
+from core.pool import create_pool
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from posts.exports import EXPORT_CHUNK_SIZE, EXPORT_SPECS, export_model
+
+
+class Command(BaseCommand):
+    help = 'Выгружает группы, посты, комментарии, лайки и подписки в NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Каталог для файлов.')
+        parser.add_argument(
+            '--models',
+            nargs='+',
+            choices=list(EXPORT_SPECS),
+            default=list(EXPORT_SPECS),
+            help='Модели для выгрузки. По умолчанию - все.',
+        )
+        parser.add_argument(
+            '--since',
+            type=datetime.fromisoformat,
+            help='Выгрузить посты и комментарии, созданные не раньше даты '
+                 '(ГГГГ-ММ-ДД или ГГГГ-ММ-ДДTЧЧ:ММ). Остальные модели '
+                 'выгружаются целиком.',
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Сжимать файлы gzip.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.BACKGROUND_WORKERS,
+            help='Количество процессов. 0 - в текущем процессе.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help='Количество строк в одном запросе.',
+        )
+
+    def handle(self, *args, **options):
+        os.makedirs(options['directory'], exist_ok=True)
+        export = partial(
+            export_model,
+            directory=options['directory'],
+            since=options['since'],
+            compress=options['gzip'],
+            chunk_size=options['chunk_size'],
+        )
+        models = options['models']
+        started = time.monotonic()
+        if options['workers']:
+            workers = min(options['workers'], len(models))
+            with create_pool(workers) as pool:
+                counts = list(pool.map(export, models))
+        else:
+            counts = [export(name) for name in models]
+        elapsed = time.monotonic() - started
+        for name, count in zip(models, counts):
+            self.stdout.write(f'{name}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено записей: {sum(counts)} за {elapsed:.1f} с'
+        ))
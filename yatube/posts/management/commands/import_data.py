@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from posts.imports import (IMPORT_BATCH_SIZE, IMPORT_MODELS, Importer,
+                           model_name, read_records, rebuild_derived_data)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает группы, посты, комментарии, лайки и подписки из файлов '
+        'NDJSON или CSV, например post.ndjson.gz или follow.csv.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Файлы для загрузки.')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help='Количество записей в одной транзакции.',
+        )
+        parser.add_argument(
+            '--skip-rebuild',
+            action='store_true',
+            help='Не пересобирать ленты, счетчики и поисковый индекс.',
+        )
+
+    def handle(self, *args, **options):
+        files = {}
+        for path in options['paths']:
+            name = model_name(path)
+            if name not in IMPORT_MODELS:
+                raise CommandError(f'Неизвестная модель в имени файла: {path}')
+            files.setdefault(name, []).append(path)
+        importer = Importer(options['batch_size'])
+        for name in IMPORT_MODELS:
+            for path in files.get(name, []):
+                started = time.monotonic()
+                count = importer.import_records(name, read_records(path))
+                elapsed = max(time.monotonic() - started, 1e-6)
+                self.stdout.write(
+                    f'{name}: {count} за {elapsed:.1f} с '
+                    f'({count / elapsed:.0f} записей/с)'
+                )
+        if not options['skip_rebuild']:
+            rebuild_derived_data(self.stdout)
+        self.stdout.write(self.style.SUCCESS('Загрузка завершена'))
@@ -0,0 +1,35 @@
+from core.pool import create_pool
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from posts.models import Post
+from posts.thumbnails import process_post_image
+
+
+class Command(BaseCommand):
+    help = 'Создает миниатюры и варианты уже загруженных изображений постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.BACKGROUND_WORKERS,
+            help='Количество процессов. 0 - в текущем процессе.',
+        )
+
+    def handle(self, *args, **options):
+        post_ids = Post.objects.exclude(image='').order_by().values_list(
+            'pk', flat=True,
+        )
+        if options['workers']:
+            with create_pool(options['workers']) as pool:
+                results = list(pool.map(
+                    process_post_image, post_ids.iterator(), chunksize=16,
+                ))
+        else:
+            results = [
+                process_post_image(post_id)
+                for post_id in post_ids.iterator()
+            ]
+        self.stdout.write(self.style.SUCCESS(
+            f'Изображений: {len(results)}, вариантов: {sum(results)}'
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from posts.search import (SEARCH_BATCH_SIZE, rebuild_search_index,
+                          search_available)
+
+
+class Command(BaseCommand):
+    help = 'Заново заполняет полнотекстовый индекс постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SEARCH_BATCH_SIZE,
+            help='Количество постов в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        if not search_available():
+            raise CommandError(
+                'Полнотекстовый индекс доступен только в SQLite'
+            )
+        indexed = rebuild_search_index(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {indexed}'
+        ))
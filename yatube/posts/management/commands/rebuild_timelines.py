@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from posts.services import rebuild_timeline
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames',
+            nargs='*',
+            help='Имена пользователей. По умолчанию - все, у кого есть лента.',
+        )
+
+    def handle(self, *args, **options):
+        if options['usernames']:
+            user_ids = User.objects.filter(
+                username__in=options['usernames'],
+            ).values_list('id', flat=True)
+        else:
+            user_ids = User.objects.filter(
+                Q(follower__isnull=False) | Q(timeline__isnull=False),
+            ).values_list('id', flat=True).distinct()
+        users = entries = 0
+        for user_id in user_ids.iterator():
+            with transaction.atomic():
+                entries += rebuild_timeline(user_id)
+            users += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобрано лент: {users}, записей: {entries}'
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from posts.services import RECOUNT_BATCH_SIZE, recount_follow_stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики подписчиков и подписок пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=RECOUNT_BATCH_SIZE,
+            help='Количество пользователей за один проход.',
+        )
+
+    def handle(self, *args, **options):
+        updated = recount_follow_stats(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано счетчиков подписок: {updated}'
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from posts.services import RECOUNT_BATCH_SIZE, recount_like_counts
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает и исправляет счетчики лайков постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=RECOUNT_BATCH_SIZE,
+            help='Размер диапазона идентификаторов постов за один проход.',
+        )
+
+    def handle(self, *args, **options):
+        repaired = recount_like_counts(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счетчиков лайков: {repaired}'
+        ))
@@ -0,0 +1,88 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from faker import Faker
+from posts.imports import IMPORT_BATCH_SIZE, Importer, rebuild_derived_data
+from posts.seeding import DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        'Создает синтетические данные: пользователей, группы, посты с '
+        'изображениями, комментарии, лайки и подписки.'
+    )
+
+    def add_arguments(self, parser):
+        counts = (
+            ('users', 1000, 'Количество пользователей.'),
+            ('groups', 20, 'Количество групп.'),
+            ('posts', 10000, 'Количество постов.'),
+            ('comments', 30000, 'Количество комментариев.'),
+            ('likes', 50000, 'Сколько раз выбирать пост для лайка.'),
+            ('follows', 5000, 'Сколько раз выбирать автора для подписки.'),
+        )
+        for name, default, help_text in counts:
+            parser.add_argument(
+                f'--{name}', type=int, default=default, help=help_text,
+            )
+        parser.add_argument(
+            '--image-share',
+            type=float,
+            default=0.2,
+            help='Доля постов с изображением, от 0 до 1.',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='За сколько последних дней распределены публикации.',
+        )
+        parser.add_argument(
+            '--seed', type=int, help='Зерно для воспроизводимых данных.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help='Количество записей в одной транзакции.',
+        )
+        parser.add_argument(
+            '--locale', default='ru_RU', help='Локаль Faker.',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['days'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь и день.')
+        fake = Faker(options['locale'])
+        fake.seed_instance(options['seed'])
+        generator = DatasetGenerator(
+            fake, random.Random(options['seed']), options['days'],
+        )
+        self.timed('user', generator.create_users, options['users'],
+                   options['batch_size'])
+        importer = Importer(options['batch_size'])
+        steps = (
+            ('group', generator.groups(options['groups'])),
+            ('post', generator.posts_records(
+                options['posts'], options['image_share'],
+            )),
+            ('comment', generator.comments(options['comments'])),
+            ('like', generator.likes(options['likes'])),
+            ('follow', generator.follows(options['follows'])),
+        )
+        # Генераторы ленивые: комментарии и лайки выбирают посты,
+        # созданные на предыдущем шаге.
+        for name, records in steps:
+            self.timed(name, importer.import_records, name, records)
+        rebuild_derived_data(self.stdout)
+        self.stdout.write(self.style.SUCCESS('Данные созданы'))
+
+    def timed(self, name, func, *args):
+        started = time.monotonic()
+        count = func(*args)
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            f'{name}: {count} за {elapsed:.1f} с '
+            f'({count / elapsed:.0f} записей/с)'
+        )
@@ -0,0 +1,50 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:32
+
+from django.db import migrations, models
+from django.db.models import Count
+
+BATCH_SIZE = 1000
+
+
+def backfill_like_count(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Like = apps.get_model('posts', 'Like')
+    Post = apps.get_model('posts', 'Post')
+    post_type = ContentType.objects.filter(
+        app_label='posts',
+        model='post',
+    ).first()
+    if post_type is None:
+        return
+    post_ids = Post.objects.order_by('pk').values_list('pk', flat=True)
+    last_pk = 0
+    while True:
+        chunk = list(post_ids.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not chunk:
+            break
+        last_pk = chunk[-1]
+        counts = Like.objects.filter(
+            content_type=post_type,
+            object_id__in=chunk,
+        ).order_by().values('object_id').annotate(total=Count('pk'))
+        for row in counts:
+            Post.objects.filter(pk=row['object_id']).update(
+                like_count=row['total'],
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('posts', '0011_post_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество лайков'),
+        ),
+        migrations.RunPython(backfill_like_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:33
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+BATCH_SIZE = 1000
+
+
+def dedupe_likes(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Like = apps.get_model('posts', 'Like')
+    Post = apps.get_model('posts', 'Post')
+    post_type = ContentType.objects.filter(
+        app_label='posts',
+        model='post',
+    ).first()
+    duplicates = Like.objects.order_by().values(
+        'user_id', 'content_type_id', 'object_id',
+    ).annotate(keep_id=Min('pk'), total=Count('pk')).filter(total__gt=1)
+    while True:
+        batch = list(duplicates[:BATCH_SIZE])
+        if not batch:
+            break
+        for row in batch:
+            Like.objects.filter(
+                user_id=row['user_id'],
+                content_type_id=row['content_type_id'],
+                object_id=row['object_id'],
+            ).exclude(pk=row['keep_id']).delete()
+            if post_type and row['content_type_id'] == post_type.pk:
+                Post.objects.filter(pk=row['object_id']).update(
+                    like_count=Like.objects.filter(
+                        content_type_id=post_type.pk,
+                        object_id=row['object_id'],
+                    ).count(),
+                )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_like_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_likes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['content_type', 'object_id'], name='posts_like_content_4ca6af_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='like',
+            constraint=models.UniqueConstraint(fields=('user', 'content_type', 'object_id'), name='unique_like'),
+        ),
+    ]
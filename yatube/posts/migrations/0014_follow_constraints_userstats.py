@@ -0,0 +1,70 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:34
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def dedupe_follows(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    duplicates = Follow.objects.order_by().values(
+        'user_id', 'author_id',
+    ).annotate(keep_id=Min('pk'), total=Count('pk')).filter(total__gt=1)
+    while True:
+        batch = list(duplicates[:BATCH_SIZE])
+        if not batch:
+            break
+        for row in batch:
+            Follow.objects.filter(
+                user_id=row['user_id'],
+                author_id=row['author_id'],
+            ).exclude(pk=row['keep_id']).delete()
+
+
+def fill_user_stats(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    stats = {}
+    followers = Follow.objects.order_by().values('author_id').annotate(
+        total=Count('pk'),
+    )
+    for row in followers.iterator():
+        stats.setdefault(
+            row['author_id'], UserStats(user_id=row['author_id']),
+        ).followers_count = row['total']
+    following = Follow.objects.order_by().values('user_id').annotate(
+        total=Count('pk'),
+    )
+    for row in following.iterator():
+        stats.setdefault(
+            row['user_id'], UserStats(user_id=row['user_id']),
+        ).following_count = row['total']
+    UserStats.objects.bulk_create(stats.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0013_like_constraints'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_follows, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Количество подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Количество подписок')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:45
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Post = apps.get_model('posts', 'Post')
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE posts_post_fts USING fts5('
+        'text, tokenize="unicode61 remove_diacritics 2")'
+    )
+    posts = Post.objects.order_by('pk').values_list('pk', 'text')
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO posts_post_fts (rowid, text) VALUES (%s, %s)',
+                batch,
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_follow_constraints_userstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_image_variant'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheVersion',
+            fields=[
+                ('scope', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='Область')),
+                ('changed', models.DateTimeField(verbose_name='Изменена')),
+            ],
+        ),
+    ]
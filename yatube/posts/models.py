@@ -55,6 +55,17 @@ class Like(models.Model):
         'object_id',
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['content_type', 'object_id']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'content_type', 'object_id'],
+                name='unique_like',
+            ),
+        ]
+
     def __str__(self):
         return (
             f'{self.user} лайкнул '
@@ -71,6 +82,7 @@ class Post(models.Model):
     :param author: Автор поста.
     :param group: Группа, к которой относится пост.
     :param image: Изображение, прикрепленное к посту.
+    :param like_count: Количество лайков, поддерживается сервисами лайков.
     """
     text = models.TextField(
         verbose_name='Текст',
@@ -99,6 +111,11 @@ class Post(models.Model):
         blank=True,
     )
     likes = GenericRelation(Like)
+    like_count = models.PositiveIntegerField(
+        verbose_name='Количество лайков',
+        default=0,
+        editable=False,
+    )
 
     def __str__(self):
         """
@@ -108,12 +125,129 @@ class Post(models.Model):
         """
         return f'{self.text[:TITLE_CHAR_COUNT] + "..."}'
 
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        """
+        Сохраняет пост, не перезаписывая like_count.
+
+        Счетчик меняют только запросы с F() в сервисах лайков, поэтому
+        при изменении существующего поста он исключается из UPDATE:
+        лайк, поставленный между загрузкой и сохранением поста, не
+        теряется.
+        """
+        if update_fields is None and not force_insert and not (
+            self._state.adding
+        ):
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'like_count'
+            ]
+        super().save(force_insert, force_update, using, update_fields)
+
     class Meta:
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(fields=['pub_date', 'id']),
+            models.Index(fields=['group', 'pub_date']),
+            models.Index(fields=['author', 'pub_date']),
+        ]
 
     @property
     def total_likes(self):
-        return self.likes.count()
+        return self.like_count
+
+    @property
+    def picture(self):
+        """
+        Собирает варианты изображения для тега picture.
+
+        Учитываются только варианты текущего изображения: после его
+        замены прежние варианты не выводятся, даже если еще не удалены.
+
+        :return: Словарь со srcset по форматам, адресом и размерами
+            самого крупного JPEG или None, пока JPEG-варианты не созданы.
+        """
+        variants = [
+            variant for variant in self.image_variants.all()
+            if variant.source == self.image.name
+        ]
+        if not variants:
+            return None
+        srcsets = {}
+        for variant in variants:
+            srcsets.setdefault(variant.format, []).append(
+                f'{variant.image.url} {variant.width}w'
+            )
+        largest = max(
+            (v for v in variants if v.format == ImageVariant.JPEG),
+            key=lambda variant: variant.width,
+            default=None,
+        )
+        if largest is None:
+            return None
+        return {
+            'webp': ', '.join(srcsets.get(ImageVariant.WEBP, [])),
+            'jpeg': ', '.join(srcsets[ImageVariant.JPEG]),
+            'src': largest.image.url,
+            'width': largest.width,
+            'height': largest.height,
+        }
+
+
+class ImageVariant(models.Model):
+    """
+    Модель уменьшенной копии изображения поста.
+
+    Создается фоновым процессом после загрузки изображения, чтобы
+    карточки отдавали браузеру подходящий по ширине и формату файл.
+
+    :param post: Пост, к изображению которого относится вариант.
+    :param source: Имя изображения поста, из которого создан вариант.
+    :param image: Файл варианта.
+    :param format: Формат файла.
+    :param width: Ширина в пикселях.
+    :param height: Высота в пикселях.
+    """
+    WEBP = 'webp'
+    JPEG = 'jpeg'
+    FORMAT_CHOICES = (
+        (WEBP, 'WebP'),
+        (JPEG, 'JPEG'),
+    )
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='image_variants',
+        verbose_name='Пост',
+    )
+    source = models.CharField(
+        verbose_name='Исходное изображение',
+        max_length=100,
+    )
+    image = models.ImageField(
+        verbose_name='Файл',
+        upload_to='posts/variants/',
+    )
+    format = models.CharField(
+        verbose_name='Формат',
+        max_length=4,
+        choices=FORMAT_CHOICES,
+    )
+    width = models.PositiveIntegerField(verbose_name='Ширина')
+    height = models.PositiveIntegerField(verbose_name='Высота')
+
+    class Meta:
+        ordering = ('width',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'format', 'width'],
+                name='unique_image_variant',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}: {self.format} {self.width}w'
 
 
 class Comment(CreatedModel):
@@ -169,3 +303,115 @@ class Follow(models.Model):
         related_name='following',
         verbose_name='Автор',
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow',
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """
+    Модель счетчиков подписок пользователя.
+
+    Поддерживается при подписке и отписке, чтобы профиль не считал
+    подписки запросами COUNT.
+
+    :param user: Пользователь, к которому относятся счетчики.
+    :param followers_count: Количество подписчиков пользователя.
+    :param following_count: Количество авторов, на которых подписан
+        пользователь.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Количество подписок',
+        default=0,
+    )
+
+    def __str__(self):
+        return f'{self.user}: {self.followers_count}/{self.following_count}'
+
+
+class Timeline(models.Model):
+    """
+    Модель записи в ленте подписок пользователя.
+
+    Заполняется при публикации поста для всех подписчиков автора,
+    поэтому лента читается одним проходом по индексу.
+
+    :param user: Пользователь, которому принадлежит лента.
+    :param post: Пост, попавший в ленту.
+    :param author: Автор поста (копия для быстрой отписки).
+    :param pub_date: Дата публикации поста (копия для сортировки).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Пользователь',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+    )
+
+    class Meta:
+        ordering = ('-pub_date',)
+        indexes = [
+            models.Index(fields=['user', '-pub_date']),
+            models.Index(fields=['user', 'author']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.post}'
+
+
+class CacheVersion(models.Model):
+    """
+    Модель версии области кеша страниц.
+
+    Хранится в базе, чтобы изменение, сделанное в одном процессе, сразу
+    видели все процессы сервера и фоновые задачи.
+
+    :param scope: Название области, например group:<slug>.
+    :param changed: Время последнего изменения области.
+    """
+    scope = models.CharField(
+        verbose_name='Область',
+        max_length=255,
+        primary_key=True,
+    )
+    changed = models.DateTimeField(verbose_name='Изменена')
+
+    def __str__(self):
+        return f'{self.scope}: {self.changed}'
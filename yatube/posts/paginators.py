@@ -0,0 +1,325 @@
+import base64
+import binascii
+import hashlib
+from datetime import datetime
+from math import ceil
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .cache import POSTS_SCOPE, bump_versions, get_versions
+
+CURSOR_SEPARATOR: str = '|'
+COUNT_SCOPE: str = 'count:{scope}'
+COUNT_CACHE_TIMEOUT: int = 60 * 60
+PAGE_WINDOW: int = 2
+LAST_PAGE: str = 'last'
+# Наибольшее целое SQLite: большие смещения и id база не принимает.
+MAX_SQL_INTEGER: int = 2 ** 63 - 1
+
+
+def invalidate_counts(*scopes):
+    """
+    Сбрасывает закешированные количества объектов в списках.
+
+    :param scopes: Области списков, которые изменились, например
+        POSTS_SCOPE или GROUP_SCOPE с подставленным slug.
+    """
+    bump_versions(*(COUNT_SCOPE.format(scope=scope) for scope in scopes))
+
+
+def encode_cursor(obj, date_field='pub_date') -> str:
+    """
+    Кодирует позицию объекта в непрозрачный токен курсора.
+
+    :param obj: Объект, на котором заканчивается или начинается страница.
+    :param date_field: Поле даты, по которому упорядочен список.
+    :return: Токен вида base64(дата|id).
+    """
+    date = getattr(obj, date_field)
+    raw = f'{date.isoformat()}{CURSOR_SEPARATOR}{obj.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Декодирует токен курсора.
+
+    :param token: Токен из параметра запроса.
+    :return: Кортеж (дата, id) или None, если токен некорректен или
+        значения нельзя передать в базу: дата с часовым поясом не
+        совпадает с USE_TZ или id вне диапазона целых SQLite.
+    """
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        date, pk = raw.decode().split(CURSOR_SEPARATOR)
+        date, pk = datetime.fromisoformat(date), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if (date.tzinfo is not None) != settings.USE_TZ:
+        return None
+    if not 1 <= pk <= MAX_SQL_INTEGER:
+        return None
+    return date, pk
+
+
+class CursorPage(Page):
+    """
+    Страница курсорной пагинации.
+
+    Номер страницы и общее количество объектов неизвестны, поэтому
+    соседние страницы определяются по лишней выбранной строке.
+    """
+    cursor_mode = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return encode_cursor(
+            self.object_list[-1], self.paginator.date_field,
+        )
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return encode_cursor(
+            self.object_list[0], self.paginator.date_field,
+        )
+
+
+class CursorPaginator(Paginator):
+    """
+    Пагинатор по ключу (дата, id), по умолчанию (pub_date, id).
+
+    Вместо COUNT(*) и OFFSET выбирает per_page + 1 строк после или до
+    курсора, поэтому стоимость страницы не зависит от ее глубины.
+    """
+
+    def __init__(self, object_list, per_page, date_field='pub_date',
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.date_field = date_field
+
+    def _beyond(self, key, direction):
+        date, pk = key
+        return (
+            Q(**{f'{self.date_field}__{direction}': date})
+            | Q(**{self.date_field: date, f'pk__{direction}': pk})
+        )
+
+    def page_after(self, token=None):
+        """
+        Возвращает страницу объектов, созданных раньше курсора.
+
+        :param token: Токен курсора. Без него - первая страница.
+        """
+        key = decode_cursor(token)
+        queryset = self.object_list
+        if key is not None:
+            queryset = queryset.filter(self._beyond(key, 'lt'))
+        rows = list(queryset.order_by(
+            f'-{self.date_field}', '-pk',
+        )[:self.per_page + 1])
+        return CursorPage(
+            rows[:self.per_page],
+            self,
+            has_next=len(rows) > self.per_page,
+            has_previous=key is not None,
+        )
+
+    def page_before(self, token):
+        """
+        Возвращает страницу объектов, созданных позже курсора.
+
+        :param token: Токен курсора. Некорректный токен дает первую
+            страницу.
+        """
+        key = decode_cursor(token)
+        if key is None:
+            return self.page_after()
+        queryset = self.object_list.filter(self._beyond(key, 'gt'))
+        rows = list(queryset.order_by(
+            self.date_field, 'pk',
+        )[:self.per_page + 1])
+        return CursorPage(
+            rows[:self.per_page][::-1],
+            self,
+            has_next=True,
+            has_previous=len(rows) > self.per_page,
+        )
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Постраничный пагинатор с дешевым подсчетом.
+
+    Страница выбирается с одной лишней строкой: по ней определяется,
+    есть ли следующая страница, а на последней странице - количество
+    объектов без COUNT(*). Пока количество неизвестно, страницы
+    считаются до следующей за текущей. Количество кешируется по тексту
+    запроса и версиям областей списка, поэтому изменение одного списка
+    не сбрасывает количества других. COUNT(*) выполняется только для
+    перехода на последнюю страницу, если количество неизвестно.
+
+    :param scopes: Области списка для invalidate_counts, например
+        AUTHOR_SCOPE с подставленным именем автора.
+    """
+
+    def __init__(self, object_list, per_page, orphans=0,
+                 allow_empty_first_page=True, window=PAGE_WINDOW,
+                 scopes=(POSTS_SCOPE,)):
+        super().__init__(
+            object_list, per_page, orphans, allow_empty_first_page
+        )
+        self.window = window
+        self.scopes = tuple(scopes)
+        self.number = 1
+        self.has_next_page = False
+
+    @cached_property
+    def count_cache_key(self):
+        try:
+            sql = str(self.object_list.query)
+        except (AttributeError, EmptyResultSet):
+            return None
+        versions = get_versions(*(
+            COUNT_SCOPE.format(scope=scope) for scope in self.scopes
+        ))
+        digest = hashlib.md5(
+            '|'.join([sql, *map(str, versions)]).encode()
+        ).hexdigest()
+        return f'posts:count:{digest}'
+
+    def cached_count(self):
+        """
+        Возвращает известное количество объектов без COUNT(*).
+
+        :return: Количество или None, если его нет в кеше.
+        """
+        if 'count' in self.__dict__:
+            return self.__dict__['count']
+        if self.count_cache_key is None:
+            return None
+        count = cache.get(self.count_cache_key)
+        if count is not None:
+            self.__dict__['count'] = count
+        return count
+
+    @cached_property
+    def count(self):
+        """Возвращает количество объектов из кеша или считает его."""
+        count = self.cached_count()
+        if count is None:
+            count = self._count_rows()
+            self._store_count(count)
+        return count
+
+    def _count_rows(self):
+        if hasattr(self.object_list, 'query'):
+            return self.object_list.count()
+        return len(self.object_list)
+
+    @property
+    def num_pages(self):
+        """Количество страниц, известное без COUNT(*)."""
+        count = self.cached_count()
+        if count is None:
+            return self.number + 1 if self.has_next_page else self.number
+        return self._pages(count)
+
+    def _pages(self, count):
+        if count == 0 and not self.allow_empty_first_page:
+            return 0
+        return ceil(max(1, count - self.orphans) / self.per_page)
+
+    def _store_count(self, count):
+        self.__dict__['count'] = count
+        if self.count_cache_key is not None:
+            cache.set(self.count_cache_key, count, COUNT_CACHE_TIMEOUT)
+
+    def _forget_count(self):
+        self.__dict__.pop('count', None)
+        if self.count_cache_key is not None:
+            cache.delete(self.count_cache_key)
+
+    def validate_number(self, number):
+        """
+        Проверяет номер страницы без подсчета объектов.
+
+        Номер LAST_PAGE означает последнюю страницу. Номер, смещение
+        которого не помещается в целое SQLite, сразу считается пустой
+        страницей, остальные номера за концом списка обнаруживаются в
+        page() по пустой выборке.
+        """
+        if number == LAST_PAGE:
+            return self._pages(self.count)
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        if number * self.per_page >= MAX_SQL_INTEGER:
+            raise EmptyPage('That page contains no results')
+        return number
+
+    def get_page(self, number):
+        try:
+            return self.page(number)
+        except PageNotAnInteger:
+            return self.page(1)
+        except EmptyPage:
+            return self.page(LAST_PAGE)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        if not rows and number > 1:
+            self._store_count(self._count_rows())
+            raise EmptyPage('That page contains no results')
+        if not has_next:
+            self._store_count(bottom + len(rows))
+        else:
+            count = self.cached_count()
+            if count is not None and count <= bottom + self.per_page:
+                # Количество устарело: за страницей есть еще объекты.
+                self._forget_count()
+        self.number = number
+        self.has_next_page = has_next
+        return self._get_page(rows[:self.per_page], number, self)
+
+    @property
+    def page_window(self):
+        """Номера страниц вокруг текущей для ссылок пагинации."""
+        first = max(self.number - self.window, 1)
+        last = min(self.number + self.window, self.num_pages)
+        return range(first, last + 1)
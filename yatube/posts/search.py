@@ -0,0 +1,145 @@
+import re
+
+from django.db import connection, transaction
+
+from .models import Post
+
+SEARCH_TABLE: str = 'posts_post_fts'
+SEARCH_BATCH_SIZE: int = 1000
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def search_available() -> bool:
+    """Показывает, поддерживает ли база полнотекстовый индекс FTS5."""
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(query) -> str:
+    """
+    Превращает пользовательский запрос в выражение FTS5 MATCH.
+
+    Каждое слово берется в кавычки, поэтому операторы FTS5 из запроса
+    не интерпретируются, а все слова должны встретиться в тексте.
+    Последнее слово ищется по префиксу.
+
+    :param query: Строка поиска.
+    :return: Выражение MATCH или пустая строка, если слов нет.
+    """
+    words = WORD_PATTERN.findall(query)
+    if not words:
+        return ''
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search_posts(query):
+    """
+    Ищет посты по тексту.
+
+    :param query: Строка поиска.
+    :return: QuerySet постов, отсортированный по релевантности.
+    """
+    match = build_match_query(query)
+    if not match:
+        return Post.objects.none()
+    if not search_available():
+        return Post.objects.filter(text__icontains=query)
+    return Post.objects.extra(
+        tables=[SEARCH_TABLE],
+        where=[
+            f'{SEARCH_TABLE}.rowid = {Post._meta.db_table}.id',
+            f'{SEARCH_TABLE} MATCH %s',
+        ],
+        params=[match],
+        select={'rank': f'{SEARCH_TABLE}.rank'},
+        order_by=['rank', '-pub_date'],
+    )
+
+
+def matching_post_ids(query):
+    """
+    Подзапрос идентификаторов постов, найденных по тексту.
+
+    :param query: Строка поиска.
+    :return: QuerySet для фильтра pk__in без сортировки по релевантности.
+    """
+    return search_posts(query).order_by().values('pk')
+
+
+def index_post(post):
+    """
+    Обновляет текст поста в поисковом индексе.
+
+    :param post: Сохраненный пост.
+    """
+    if not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [post.pk]
+        )
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, text) VALUES (%s, %s)',
+            [post.pk, post.text],
+        )
+
+
+def unindex_post(post_id):
+    """
+    Удаляет пост из поискового индекса.
+
+    :param post_id: Идентификатор удаленного поста.
+    """
+    if not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [post_id]
+        )
+
+
+def rebuild_search_index(batch_size=SEARCH_BATCH_SIZE) -> int:
+    """
+    Заново заполняет поисковый индекс порциями.
+
+    Каждая порция заменяет строки индекса своего диапазона id в одной
+    транзакции, поэтому во время пересборки поиск находит все посты:
+    старые строки остаются, пока их не заменят новые.
+
+    :param batch_size: Количество постов в одной транзакции.
+    :return: Количество проиндексированных постов.
+    """
+    if not search_available():
+        return 0
+    post_table = Post._meta.db_table
+    last_id = 0
+    indexed = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT MAX(id), COUNT(*) FROM ('
+                f'SELECT id FROM {post_table} WHERE id > %s '
+                f'ORDER BY id LIMIT %s)',
+                [last_id, batch_size],
+            )
+            max_id, count = cursor.fetchone()
+            if not count:
+                cursor.execute(
+                    f'DELETE FROM {SEARCH_TABLE} WHERE rowid > %s',
+                    [last_id],
+                )
+                return indexed
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} '
+                f'WHERE rowid > %s AND rowid <= %s',
+                [last_id, max_id],
+            )
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, text) '
+                f'SELECT id, text FROM {post_table} '
+                f'WHERE id > %s AND id <= %s',
+                [last_id, max_id],
+            )
+        last_id = max_id
+        indexed += count
@@ -0,0 +1,209 @@
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .imports import IMPORT_BATCH_SIZE, batches
+from .models import Post
+
+# Показатель закона Ципфа: чем больше, тем сильнее популярность
+# сосредоточена у немногих авторов, групп и постов.
+POPULARITY_SKEW: float = 1.1
+NO_GROUP_SHARE: float = 0.3
+SEED_IMAGE_SIZES: tuple = ((1600, 1200), (1200, 900), (960, 960), (720, 1080))
+SEED_IMAGE_QUALITY: int = 85
+
+User = get_user_model()
+
+
+def zipf_weights(count, skew=POPULARITY_SKEW) -> list:
+    """
+    Накопленные веса элементов по закону Ципфа: первый самый популярный.
+
+    Накопленные веса передаются в random.choices как cum_weights, чтобы
+    не пересчитывать их при каждом выборе.
+
+    :param count: Количество элементов.
+    :param skew: Показатель степени.
+    """
+    return list(accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+def make_image(rng) -> bytes:
+    """
+    Рисует JPEG с цветным градиентом случайного размера.
+
+    :param rng: Генератор случайных чисел.
+    :return: Содержимое файла.
+    """
+    size = rng.choice(SEED_IMAGE_SIZES)
+    gradient = Image.linear_gradient('L').rotate(rng.randrange(360))
+    colors = [
+        tuple(rng.randrange(256) for _ in range(3)) for _ in range(2)
+    ]
+    image = ImageOps.colorize(gradient.resize(size), *colors)
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=SEED_IMAGE_QUALITY)
+    return buffer.getvalue()
+
+
+class DatasetGenerator:
+    """
+    Генератор синтетических записей в формате импорта.
+
+    Популярность авторов, групп и постов распределена по закону Ципфа:
+    немногие авторы пишут большую часть постов и собирают большую часть
+    комментариев, лайков и подписчиков, как на настоящем сайте.
+
+    :param fake: Экземпляр Faker.
+    :param rng: Генератор случайных чисел.
+    :param days: За сколько последних дней распределены публикации.
+    """
+
+    def __init__(self, fake, rng, days):
+        self.fake = fake
+        self.rng = rng
+        self.now = timezone.now()
+        self.days = days
+        self.usernames = []
+        self.user_weights = []
+        self.slugs = []
+        self.posts = []
+        self.post_weights = []
+
+    def create_users(self, count, batch_size=IMPORT_BATCH_SIZE) -> int:
+        """
+        Создает пользователей с именами и общим неиспользуемым паролем.
+
+        :param count: Количество пользователей.
+        :param batch_size: Размер пачки bulk_create.
+        :return: Количество пользователей в выборке генератора.
+        """
+        password = make_password(None)
+        start = User.objects.count()
+        users = [
+            User(
+                username=f'{self.fake.user_name()}_{start + number}',
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                email=self.fake.email(),
+                password=password,
+            )
+            for number in range(count)
+        ]
+        for batch in batches(users, batch_size):
+            User.objects.bulk_create(batch, ignore_conflicts=True)
+        self.usernames = [user.username for user in users]
+        self.rng.shuffle(self.usernames)
+        self.user_weights = zipf_weights(len(self.usernames))
+        return len(self.usernames)
+
+    def groups(self, count):
+        for number in range(count):
+            slug = f'{self.fake.slug()}-{number}'
+            self.slugs.append(slug)
+            yield {
+                'slug': slug,
+                'title': self.fake.catch_phrase()[:200],
+                'description': self.fake.paragraph(),
+            }
+
+    def pub_date(self):
+        return self.now - timedelta(
+            seconds=self.rng.randrange(self.days * 24 * 60 * 60),
+        )
+
+    def posts_records(self, count, image_share):
+        """
+        Генерирует посты и запоминает их для комментариев и лайков.
+
+        :param count: Количество постов.
+        :param image_share: Доля постов с изображением.
+        """
+        start = (Post.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+        authors = self.rng.choices(
+            range(len(self.usernames)), cum_weights=self.user_weights, k=count,
+        )
+        group_weights = zipf_weights(len(self.slugs))
+        for post_id, author in enumerate(authors, start):
+            pub_date = self.pub_date()
+            self.posts.append((post_id, pub_date))
+            self.post_weights.append(1 / (author + 1) ** POPULARITY_SKEW)
+            group = None
+            if self.slugs and self.rng.random() >= NO_GROUP_SHARE:
+                group = self.rng.choices(
+                    self.slugs, cum_weights=group_weights,
+                )[0]
+            image = ''
+            if self.rng.random() < image_share:
+                image = default_storage.save(
+                    f'posts/seed-{post_id}.jpg',
+                    ContentFile(make_image(self.rng)),
+                )
+            yield {
+                'id': post_id,
+                'text': self.fake.paragraph(
+                    nb_sentences=self.rng.randint(1, 8),
+                ),
+                'pub_date': pub_date,
+                'author': self.usernames[author],
+                'group': group,
+                'image': image,
+            }
+
+    def popular_posts(self, count) -> list:
+        """
+        Выбирает посты с повторами: посты популярных авторов чаще.
+
+        :param count: Количество выбранных постов.
+        :return: Пары из идентификатора и даты публикации.
+        """
+        return self.rng.choices(
+            self.posts, cum_weights=list(accumulate(self.post_weights)),
+            k=count,
+        )
+
+    def comments(self, count):
+        for post_id, pub_date in self.popular_posts(count):
+            age = max(int((self.now - pub_date).total_seconds()), 1)
+            yield {
+                'post': post_id,
+                'author': self.rng.choices(
+                    self.usernames, cum_weights=self.user_weights,
+                )[0],
+                'text': self.fake.sentence(),
+                'created': pub_date + timedelta(
+                    seconds=self.rng.randrange(age),
+                ),
+            }
+
+    def likes(self, count):
+        pairs = {
+            (self.rng.choice(self.usernames), post_id)
+            for post_id, _ in self.popular_posts(count)
+        }
+        for username, post_id in pairs:
+            yield {
+                'user': username,
+                'app_label': Post._meta.app_label,
+                'model': Post._meta.model_name,
+                'object_id': post_id,
+            }
+
+    def follows(self, count):
+        authors = self.rng.choices(
+            self.usernames, cum_weights=self.user_weights, k=count,
+        )
+        pairs = {
+            (self.rng.choice(self.usernames), author) for author in authors
+        }
+        for username, author in pairs:
+            if username != author:
+                yield {'user': username, 'author': author}
@@ -1,24 +1,53 @@
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
-from .models import Like
+from .models import Follow, Like, Post, Timeline, UserStats
 
 User = get_user_model()
+RECOUNT_BATCH_SIZE: int = 1000
+
+
+def _shift_like_count(obj, delta):
+    """
+    Атомарно меняет счетчик лайков объекта.
+
+    :param obj: Объект со счетчиком like_count.
+    :param delta: На сколько изменить счетчик.
+    """
+    if delta and hasattr(obj, 'like_count'):
+        type(obj).objects.filter(pk=obj.pk).update(
+            like_count=F('like_count') + delta,
+        )
 
 
 def add_like(obj, user):
     """
     Добавляет лайк объекту от пользователя.
 
+    Повторный лайк отклоняется уникальным ограничением базы, поэтому
+    одновременные запросы не создают дубликатов.
+
     :param obj: Объект, которому ставится лайк.
     :param user: Пользователь, который ставит лайк.
     """
     obj_type = ContentType.objects.get_for_model(obj)
-    like, is_created = Like.objects.get_or_create(
-        content_type=obj_type,
-        object_id=obj.id,
-        user=user,
-    )
+    try:
+        with transaction.atomic():
+            like = Like.objects.create(
+                content_type=obj_type,
+                object_id=obj.id,
+                user=user,
+            )
+            _shift_like_count(obj, 1)
+    except IntegrityError:
+        like = Like.objects.get(
+            content_type=obj_type,
+            object_id=obj.id,
+            user=user,
+        )
     return like
 
 
@@ -30,11 +59,13 @@ def remove_like(obj, user):
     :param user: Пользователь, который удаляет свой лайк.
     """
     obj_type = ContentType.objects.get_for_model(obj)
-    Like.objects.filter(
-        content_type=obj_type,
-        object_id=obj.id,
-        user=user,
-    ).delete()
+    with transaction.atomic():
+        deleted, _ = Like.objects.filter(
+            content_type=obj_type,
+            object_id=obj.id,
+            user=user,
+        ).delete()
+        _shift_like_count(obj, -deleted)
 
 
 def is_liked(obj, user) -> bool:
@@ -56,6 +87,27 @@ def is_liked(obj, user) -> bool:
     return likes.exists()
 
 
+def get_liked_ids(objs, user) -> set:
+    """
+    Показывает, какие из объектов лайкнул пользователь, одним запросом.
+
+    :param objs: Объекты одной модели, например посты страницы.
+    :param user: Пользователь, наличие лайков которого проверяется.
+    :return: Множество идентификаторов лайкнутых объектов.
+    """
+    objs = list(objs)
+    if not objs or not user.is_authenticated:
+        return set()
+
+    obj_type = ContentType.objects.get_for_model(objs[0])
+    liked_ids = Like.objects.filter(
+        content_type=obj_type,
+        object_id__in=[obj.id for obj in objs],
+        user=user,
+    ).values_list('object_id', flat=True)
+    return set(liked_ids)
+
+
 def get_likes(obj):
     """
     Получает пользователей, которые лайкнули данный объект.
@@ -67,3 +119,264 @@ def get_likes(obj):
         likes__content_type=obj_type,
         likes__object_id=obj.id,
     )
+
+
+def recount_like_counts(batch_size=RECOUNT_BATCH_SIZE) -> int:
+    """
+    Пересчитывает счетчики лайков постов по таблице лайков.
+
+    :param batch_size: Размер диапазона идентификаторов за один проход.
+    :return: Количество исправленных постов.
+    """
+    post_type = ContentType.objects.get_for_model(Post)
+    likes = Like.objects.filter(
+        content_type=post_type,
+        object_id=OuterRef('pk'),
+    ).order_by().values('object_id').annotate(
+        total=Count('pk'),
+    ).values('total')
+    wrong_posts = Post.objects.annotate(
+        actual=Coalesce(Subquery(likes, output_field=IntegerField()), 0),
+    ).exclude(like_count=F('actual')).values_list('pk', 'actual')
+    max_pk = Post.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+    repaired = 0
+    for first_pk in range(0, max_pk, batch_size):
+        chunk = wrong_posts.filter(
+            pk__gt=first_pk,
+            pk__lte=first_pk + batch_size,
+        )
+        with transaction.atomic():
+            for pk, actual in chunk:
+                Post.objects.filter(pk=pk).update(like_count=actual)
+                repaired += 1
+    return repaired
+
+
+def _bulk_add_to_timelines(entries):
+    """
+    Пакетно добавляет записи в ленты, пропуская уже существующие.
+
+    :param entries: Итерируемые кортежи (user_id, post_id, author_id,
+        pub_date).
+    """
+    Timeline.objects.bulk_create(
+        (
+            Timeline(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for user_id, post_id, author_id, pub_date in entries
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_post(post):
+    """
+    Добавляет новый пост в ленты всех подписчиков автора.
+
+    :param post: Опубликованный пост.
+    """
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id,
+    ).values_list('user_id', flat=True)
+    _bulk_add_to_timelines(
+        (user_id, post.id, post.author_id, post.pub_date)
+        for user_id in follower_ids.iterator()
+    )
+
+
+def fill_timeline(user_id, author_id):
+    """
+    Добавляет в ленту пользователя все посты автора.
+
+    :param user_id: Идентификатор подписавшегося пользователя.
+    :param author_id: Идентификатор автора.
+    """
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'id',
+        'pub_date',
+    )
+    _bulk_add_to_timelines(
+        (user_id, post_id, author_id, pub_date)
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def trim_timeline(user_id, author_id):
+    """
+    Удаляет из ленты пользователя посты автора.
+
+    :param user_id: Идентификатор отписавшегося пользователя.
+    :param author_id: Идентификатор автора.
+    """
+    Timeline.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild_timeline(user_id) -> int:
+    """
+    Пересобирает ленту пользователя по его текущим подпискам.
+
+    :param user_id: Идентификатор пользователя.
+    :return: Количество записей в ленте после пересборки.
+    """
+    Timeline.objects.filter(user_id=user_id).delete()
+    author_ids = Follow.objects.filter(user_id=user_id).values_list(
+        'author_id',
+        flat=True,
+    ).distinct()
+    for author_id in author_ids:
+        fill_timeline(user_id, author_id)
+    return Timeline.objects.filter(user_id=user_id).count()
+
+
+def follow_author(user, author) -> bool:
+    """
+    Подписывает пользователя на автора.
+
+    Повторная подписка отклоняется уникальным ограничением базы.
+
+    :param user: Пользователь, который подписывается.
+    :param author: Автор, на которого подписываются.
+    :return: True, если подписка создана.
+    """
+    if user == author:
+        return False
+    try:
+        with transaction.atomic():
+            Follow.objects.create(user=user, author=author)
+    except IntegrityError:
+        return False
+    return True
+
+
+def unfollow_author(user, author) -> bool:
+    """
+    Отписывает пользователя от автора.
+
+    :param user: Пользователь, который отписывается.
+    :param author: Автор, от которого отписываются.
+    :return: True, если подписка существовала.
+    """
+    deleted, _ = Follow.objects.filter(user=user, author=author).delete()
+    return bool(deleted)
+
+
+def shift_follow_stats(user_id, author_id, delta):
+    """
+    Атомарно меняет счетчики подписок подписчика и автора.
+
+    :param user_id: Идентификатор подписчика.
+    :param author_id: Идентификатор автора.
+    :param delta: 1 при подписке, -1 при отписке.
+    """
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=user_id), UserStats(user_id=author_id)],
+        ignore_conflicts=True,
+    )
+    UserStats.objects.filter(user_id=user_id).update(
+        following_count=F('following_count') + delta,
+    )
+    UserStats.objects.filter(user_id=author_id).update(
+        followers_count=F('followers_count') + delta,
+    )
+
+
+def get_user_stats(user):
+    """
+    Получает счетчики подписок пользователя.
+
+    :param user: Пользователь, для которого получают счетчики.
+    :return: Сохраненные счетчики или нулевые, если их еще нет.
+    """
+    return UserStats.objects.filter(user=user).first() or UserStats(user=user)
+
+
+def recount_follow_stats(batch_size=RECOUNT_BATCH_SIZE) -> int:
+    """
+    Пересчитывает счетчики подписок всех пользователей.
+
+    :param batch_size: Количество пользователей за один проход.
+    :return: Количество обновленных строк счетчиков.
+    """
+    followers = Follow.objects.filter(
+        author_id=OuterRef('user_id'),
+    ).order_by().values('author_id').annotate(
+        total=Count('pk'),
+    ).values('total')
+    following = Follow.objects.filter(
+        user_id=OuterRef('user_id'),
+    ).order_by().values('user_id').annotate(
+        total=Count('pk'),
+    ).values('total')
+    user_ids = User.objects.order_by('pk').values_list('pk', flat=True)
+    last_pk = 0
+    updated = 0
+    while True:
+        chunk = list(user_ids.filter(pk__gt=last_pk)[:batch_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1]
+        with transaction.atomic():
+            UserStats.objects.bulk_create(
+                [UserStats(user_id=pk) for pk in chunk],
+                ignore_conflicts=True,
+            )
+            updated += UserStats.objects.filter(user_id__in=chunk).update(
+                followers_count=Coalesce(
+                    Subquery(followers, output_field=IntegerField()), 0,
+                ),
+                following_count=Coalesce(
+                    Subquery(following, output_field=IntegerField()), 0,
+                ),
+            )
+    return updated
+
+
+def get_index_posts():
+    """Получает посты главной страницы."""
+    return Post.objects.select_related('group', 'author')
+
+
+def get_group_posts(group):
+    """
+    Получает посты группы.
+
+    :param group: Группа, посты которой выводятся.
+    """
+    return group.posts.select_related('group', 'author')
+
+
+def get_author_posts(author):
+    """
+    Получает посты автора.
+
+    :param author: Автор, посты которого выводятся.
+    """
+    return author.posts.select_related('group', 'author')
+
+
+def get_follow_posts(user):
+    """
+    Получает ленту подписок пользователя.
+
+    :param user: Владелец ленты.
+    """
+    return Post.objects.filter(
+        timeline_entries__user=user,
+    ).select_related('group', 'author').order_by(
+        '-timeline_entries__pub_date',
+    )
+
+
+def get_liked_posts(user):
+    """
+    Получает посты, которые лайкнул пользователь.
+
+    :param user: Пользователь, лайки которого выводятся.
+    """
+    return Post.objects.filter(
+        likes__user=user,
+    ).select_related('group', 'author')
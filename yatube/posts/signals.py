@@ -0,0 +1,141 @@
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import (AUTHOR_SCOPE, FEED_SCOPE, GROUP_SCOPE, LIKES_SCOPE,
+                    POST_SCOPE, POSTS_SCOPE, bump_versions, post_list_scopes,
+                    post_scopes)
+from .models import Comment, Follow, Group, Like, Post
+from .paginators import invalidate_counts
+from .search import index_post, unindex_post
+from .services import (fan_out_post, fill_timeline, shift_follow_stats,
+                       trim_timeline)
+from .thumbnails import discard_stale_variants
+
+User = get_user_model()
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, **kwargs):
+    """
+    Запоминает области кеша и изображение поста до изменения, например,
+    группы.
+    """
+    if instance.pk and not raw:
+        old_post = Post.objects.select_related('author', 'group').filter(
+            pk=instance.pk,
+        ).first()
+        instance.old_cache_scopes = post_scopes(old_post) if old_post else []
+        instance.old_list_scopes = (
+            post_list_scopes(old_post) if old_post else []
+        )
+        instance.old_image_name = old_post.image.name if old_post else ''
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    """Раздает новый пост в ленты подписчиков и обновляет индексы."""
+    invalidate_counts(
+        *post_list_scopes(instance),
+        *getattr(instance, 'old_list_scopes', []),
+    )
+    if raw:
+        return
+    index_post(instance)
+    old_image_name = getattr(instance, 'old_image_name', '')
+    if old_image_name and old_image_name != instance.image.name:
+        discard_stale_variants(instance)
+    bump_versions(
+        *post_scopes(instance),
+        *getattr(instance, 'old_cache_scopes', []),
+    )
+    if created:
+        fan_out_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    """Сбрасывает количества постов и кеш страниц после удаления поста."""
+    invalidate_counts(*post_list_scopes(instance))
+    unindex_post(instance.pk)
+    bump_versions(*post_scopes(instance))
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    """Заполняет ленту и счетчики подписок после новой подписки."""
+    invalidate_counts(FEED_SCOPE.format(user_id=instance.user_id))
+    if created and not raw:
+        fill_timeline(instance.user_id, instance.author_id)
+        shift_follow_stats(instance.user_id, instance.author_id, 1)
+        bump_follow_versions(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    """Убирает посты автора из ленты и уменьшает счетчики подписок."""
+    invalidate_counts(FEED_SCOPE.format(user_id=instance.user_id))
+    trim_timeline(instance.user_id, instance.author_id)
+    shift_follow_stats(instance.user_id, instance.author_id, -1)
+    bump_follow_versions(instance)
+
+
+def bump_follow_versions(follow):
+    """Сбрасывает кеш профилей подписчика и автора."""
+    usernames = User.objects.filter(
+        pk__in=(follow.user_id, follow.author_id),
+    ).values_list('username', flat=True)
+    bump_versions(*(
+        AUTHOR_SCOPE.format(username=username) for username in usernames
+    ))
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def like_changed(sender, instance, raw=False, **kwargs):
+    """Сбрасывает количества понравившихся постов и кеш страниц поста."""
+    invalidate_counts(LIKES_SCOPE.format(user_id=instance.user_id))
+    if raw:
+        return
+    content_type = ContentType.objects.get_for_id(instance.content_type_id)
+    if content_type.model_class() is not Post:
+        return
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=instance.object_id,
+    ).first()
+    if post is not None:
+        bump_versions(*post_scopes(post))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, raw=False, **kwargs):
+    """Сбрасывает кеш страницы поста, к которому относится комментарий."""
+    if not raw:
+        bump_versions(POST_SCOPE.format(post_id=instance.post_id))
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, raw=False, **kwargs):
+    """Сбрасывает кеш страницы группы после изменения ее описания."""
+    if not raw:
+        bump_versions(GROUP_SCOPE.format(slug=instance.slug))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, raw=False, **kwargs):
+    """
+    Сбрасывает кеш страниц, где показано имя пользователя: общей ленты,
+    профиля и групп, в которых он публиковал посты.
+    """
+    if raw or update_fields and set(update_fields) <= {'last_login'}:
+        return
+    group_slugs = Group.objects.filter(posts__author=instance).values_list(
+        'slug', flat=True,
+    ).distinct()
+    bump_versions(
+        POSTS_SCOPE,
+        AUTHOR_SCOPE.format(username=instance.username),
+        *(GROUP_SCOPE.format(slug=slug) for slug in group_slugs),
+    )
@@ -0,0 +1,64 @@
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class PostAdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass',
+        )
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            text='Путешествие на Камчатку',
+            author=cls.admin,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        self.admin_client = Client()
+        self.admin_client.force_login(PostAdminTests.admin)
+        self.url = reverse('admin:posts_post_changelist')
+        cache.clear()
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.admin_client.get(self.url)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow(self):
+        """Число запросов списка постов не зависит от числа строк"""
+        expected = self.count_queries()
+        for number in range(5):
+            Post.objects.create(
+                text=f'Пост {number}',
+                author=User.objects.create_user(username=f'user{number}'),
+                group=Group.objects.create(
+                    title=f'Группа {number}', slug=f'group-{number}'
+                ),
+            )
+        self.assertEqual(
+            self.count_queries(),
+            expected,
+            'Строки списка постов выполняют дополнительные запросы',
+        )
+
+    def test_changelist_search(self):
+        """Поиск в админке находит пост по индексу"""
+        Post.objects.create(text='Рецепт пирога', author=PostAdminTests.admin)
+        response = self.admin_client.get(self.url, {'q': 'камчат'})
+        self.assertEqual(
+            list(response.context['cl'].result_list),
+            [PostAdminTests.post],
+            'Поиск в админке не нашел пост',
+        )
@@ -0,0 +1,236 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from http import HTTPStatus
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Count, F
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from ..models import Follow, Group, Like, Post, Timeline
+from ..services import follow_author, get_user_stats
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.old_post = Post.objects.create(
+            text='Старый пост', author=cls.author, group=cls.group,
+        )
+        Post.objects.filter(pk=cls.old_post.pk).update(
+            pub_date=datetime(2020, 1, 1),
+        )
+        cls.new_post = Post.objects.create(
+            text='Новый пост', author=cls.author,
+        )
+        follow_author(cls.reader, cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def read(self, name):
+        with gzip.open(
+            os.path.join(self.directory, f'{name}.ndjson.gz'), 'rt',
+        ) as lines:
+            return [json.loads(line) for line in lines]
+
+    def test_export_ndjson(self):
+        """Команда выгружает модели в NDJSON с естественными ключами"""
+        call_command(
+            'export_ndjson', self.directory, '--gzip', '--workers', '0',
+            '--chunk-size', '1', stdout=StringIO(),
+        )
+        posts = self.read('post')
+        self.assertEqual(
+            [post['id'] for post in posts],
+            [ExportTests.old_post.pk, ExportTests.new_post.pk],
+            'Выгружены не все посты',
+        )
+        self.assertEqual(posts[0]['author'], 'author')
+        self.assertEqual(posts[0]['group'], 'group')
+        self.assertEqual(
+            self.read('follow'),
+            [{'user': 'reader', 'author': 'author'}],
+            'Подписки выгружены неверно',
+        )
+
+    def test_export_since(self):
+        """Инкрементальная выгрузка содержит только новые посты"""
+        call_command(
+            'export_ndjson', self.directory, '--gzip', '--workers', '0',
+            '--models', 'post', '--since', '2021-01-01', stdout=StringIO(),
+        )
+        self.assertEqual(
+            [post['id'] for post in self.read('post')],
+            [ExportTests.new_post.pk],
+            'Выгружены посты старше --since',
+        )
+
+
+class ImportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def write(self, name, lines):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as output:
+            output.write('\n'.join(lines) + '\n')
+        return path
+
+    def test_import_data(self):
+        """Команда загружает данные и сохраняет даты публикации"""
+        pub_date = datetime(2020, 1, 1, 12, 30)
+        local_post = Post.objects.create(
+            text='Местный пост', author=ImportTests.author,
+        )
+        paths = [
+            self.write('group.csv', [
+                'slug,title,description',
+                'imported,Загруженная группа,',
+            ]),
+            self.write('post.ndjson', [json.dumps({
+                'id': local_post.pk,
+                'text': 'Загруженный пост',
+                'pub_date': pub_date.isoformat(),
+                'author': 'newcomer',
+                'group': 'imported',
+            })]),
+            self.write('comment.ndjson', [json.dumps({
+                'id': 7,
+                'post': local_post.pk,
+                'author': 'reader',
+                'text': 'Загруженный комментарий',
+                'created': pub_date.isoformat(),
+            })]),
+            self.write('like.ndjson', [json.dumps({
+                'user': 'reader',
+                'app_label': 'posts',
+                'model': 'post',
+                'object_id': local_post.pk,
+            })]),
+            self.write('follow.ndjson', [
+                json.dumps({'user': 'reader', 'author': 'newcomer'}),
+            ]),
+        ]
+        for _ in range(2):
+            call_command('import_data', *paths, stdout=StringIO())
+        post = Post.objects.select_related('author', 'group').get(
+            text='Загруженный пост',
+        )
+        self.assertNotEqual(post.pk, local_post.pk, 'Взят id из файла')
+        self.assertEqual(post.pub_date, pub_date, 'Дата публикации изменена')
+        self.assertEqual(post.author.username, 'newcomer')
+        self.assertEqual(post.group.slug, 'imported')
+        self.assertEqual(post.like_count, 1, 'Счетчик лайков не пересчитан')
+        self.assertEqual(
+            list(post.comments.values_list('text', flat=True)),
+            ['Загруженный комментарий'],
+            'Комментарий не привязан к загруженному посту',
+        )
+        local_post.refresh_from_db()
+        self.assertEqual(local_post.like_count, 0, 'Лайк у чужого поста')
+        self.assertFalse(local_post.comments.exists())
+        self.assertEqual(
+            get_user_stats(post.author).followers_count,
+            1,
+            'Счетчик подписчиков не пересчитан',
+        )
+        self.assertTrue(
+            Timeline.objects.filter(
+                user=ImportTests.reader, post=post,
+            ).exists(),
+            'Лента подписок не пересобрана',
+        )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedBenchmarkTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def seed(self, **options):
+        call_command(
+            'seed_data',
+            users=20,
+            groups=3,
+            comments=100,
+            likes=200,
+            follows=50,
+            seed=1,
+            stdout=StringIO(),
+            **options,
+        )
+
+    def test_seed_data(self):
+        """Команда создает связанные данные с перекосом популярности"""
+        self.seed(posts=600, image_share=0)
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Post.objects.count(), 600)
+        top_author = User.objects.annotate(
+            post_count=Count('posts'),
+        ).order_by('-post_count').first()
+        self.assertGreater(
+            top_author.post_count,
+            600 / 20 * 2,
+            'Посты распределены между авторами равномерно',
+        )
+        self.assertEqual(
+            sum(Post.objects.values_list('like_count', flat=True)),
+            Like.objects.count(),
+            'Счетчики лайков не пересчитаны',
+        )
+        self.assertFalse(
+            Follow.objects.filter(user=F('author')).exists(),
+            'Создана подписка на самого себя',
+        )
+
+    def test_seed_images(self):
+        """Изображения постов создаются в хранилище"""
+        self.seed(posts=2, image_share=1)
+        for post in Post.objects.all():
+            with Image.open(post.image) as image:
+                self.assertEqual(image.format, 'JPEG')
+
+    def test_benchmark_views(self):
+        """Бенчмарк проходит все представления и выводит замеры"""
+        self.seed(posts=30, image_share=0)
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            'benchmark_views', requests=2, json=True,
+            stdout=stdout, stderr=stderr,
+        )
+        results = [
+            json.loads(line) for line in stdout.getvalue().splitlines()
+        ]
+        self.assertEqual(
+            stderr.getvalue(), '', 'Есть представления без сценария',
+        )
+        self.assertIn('post_detail', {result['view'] for result in results})
+        for result in results:
+            self.assertEqual(result['status'], HTTPStatus.OK, result['view'])
+            self.assertGreater(result['bytes'], 0, result['view'])
+            self.assertLessEqual(result['p50'], result['p99'])
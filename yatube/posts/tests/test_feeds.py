@@ -0,0 +1,66 @@
+from http import HTTPStatus
+from xml.etree import ElementTree
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+ATOM_ENTRY: str = '{http://www.w3.org/2005/Atom}entry'
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            text='Текст тестового поста',
+            author=cls.author,
+            group=cls.group,
+        )
+        Post.objects.create(text='Пост без группы', author=cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_feeds_streamed(self):
+        """Ленты RSS и Atom отдаются потоком и содержат посты"""
+        feeds = {
+            reverse('posts:index_feed', args=('rss',)): ('item', 2),
+            reverse('posts:index_feed', args=('atom',)): (ATOM_ENTRY, 2),
+            reverse(
+                'posts:group_feed', args=(FeedTests.group.slug, 'atom')
+            ): (ATOM_ENTRY, 1),
+            reverse(
+                'posts:profile_feed', args=(FeedTests.author.username, 'rss')
+            ): ('item', 2),
+        }
+        for url, (tag, expected) in feeds.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertTrue(response.streaming, 'Лента не потоковая')
+                root = ElementTree.fromstring(
+                    b''.join(response.streaming_content)
+                )
+                self.assertEqual(
+                    len(root.findall(f'.//{tag}')),
+                    expected,
+                    'Количество записей ленты не соответствует ожидаемому',
+                )
+
+    def test_feed_not_modified(self):
+        """Лента отвечает 304, если новых постов не было"""
+        url = reverse('posts:index_feed', args=('atom',))
+        response = self.guest_client.get(url)
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        response = self.guest_client.get(
+            reverse('posts:index_feed', args=('json',))
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
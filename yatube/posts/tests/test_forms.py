@@ -1,13 +1,18 @@
 import shutil
 import tempfile
+from io import BytesIO
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from ..forms import PostForm
 from ..models import Comment, Group, Post
+from ..uploads import MAX_STORED_SIDE
 
 User = get_user_model()
 
@@ -16,6 +21,16 @@ TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 CURRENT_TEXT = 'Текущий текст поста'
 NEW_TEXT = 'Новый текст поста'
 EMPTY = 0
+EXIF_ORIENTATION = 0x0112
+ROTATE_90 = 6
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -50,17 +65,9 @@ class PostFormTests(TestCase):
     def test_post_create(self):
         """Пост создается корректно"""
         posts_count = Post.objects.count()
-        small_gif = (
-            b'\x47\x49\x46\x38\x39\x61\x02\x00'
-            b'\x01\x00\x80\x00\x00\x00\x00\x00'
-            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
-            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
-            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
-            b'\x0A\x00\x3B'
-        )
         uploaded = SimpleUploadedFile(
             name='small.gif',
-            content=small_gif,
+            content=SMALL_GIF,
             content_type='image/gif',
         )
         form_data = {
@@ -168,6 +175,55 @@ class PostFormTests(TestCase):
             'Пост не появился на странице новой группы',
         )
 
+    def test_large_image_reduced(self):
+        """Крупное изображение уменьшается и поворачивается по EXIF"""
+        exif = Image.Exif()
+        exif[EXIF_ORIENTATION] = ROTATE_90
+        buffer = BytesIO()
+        Image.new('RGB', (3000, 1000), 'red').save(
+            buffer, 'JPEG', exif=exif.tobytes(),
+        )
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': CURRENT_TEXT,
+                'image': SimpleUploadedFile(
+                    name='large.jpg',
+                    content=buffer.getvalue(),
+                    content_type='image/jpeg',
+                ),
+            },
+        )
+        created_post = Post.objects.latest('pub_date')
+        with Image.open(created_post.image) as image:
+            self.assertEqual(
+                image.size,
+                (683, MAX_STORED_SIDE),
+                'Изображение не уменьшено или не повернуто',
+            )
+            self.assertFalse(
+                image.getexif(),
+                'EXIF изображения не удален',
+            )
+
+    def test_image_pixel_limit(self):
+        """Изображение с лишними пикселями не принимается"""
+        uploaded = SimpleUploadedFile(
+            name='small.gif',
+            content=SMALL_GIF,
+            content_type='image/gif',
+        )
+        with mock.patch('posts.uploads.MAX_IMAGE_PIXELS', 1):
+            form = PostForm(
+                data={'text': CURRENT_TEXT},
+                files={'image': uploaded},
+            )
+            self.assertFalse(
+                form.is_valid(),
+                'Форма приняла изображение сверх лимита пикселей',
+            )
+        self.assertIn('image', form.errors)
+
     def test_add_comment(self):
         """Комментарий добавляется корректно"""
         comments_count = Comment.objects.count()
@@ -0,0 +1,105 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..search import SEARCH_TABLE, search_posts
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            text='Путешествие на Камчатку',
+            author=cls.author,
+        )
+        Post.objects.create(text='Рецепт пирога', author=cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def search(self, query):
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': query}
+        )
+        return list(response.context['page_obj'])
+
+    def test_search_finds_post(self):
+        """Поиск находит пост по началу слова"""
+        self.assertEqual(
+            self.search('камчат'),
+            [SearchTests.post],
+            'Поиск не нашел пост',
+        )
+
+    def test_search_index_updated(self):
+        """Поисковый индекс обновляется при изменении и удалении поста"""
+        SearchTests.post.text = 'Поход в горы'
+        SearchTests.post.save()
+        self.assertEqual(
+            self.search('Камчатку'),
+            [],
+            'Поиск нашел старый текст поста',
+        )
+        self.assertEqual(
+            self.search('горы'),
+            [SearchTests.post],
+            'Поиск не нашел новый текст поста',
+        )
+        SearchTests.post.delete()
+        self.assertEqual(
+            self.search('горы'),
+            [],
+            'Поиск нашел удаленный пост',
+        )
+
+    def test_rebuild_search_index(self):
+        """Команда пересборки восстанавливает поисковый индекс"""
+        Post.objects.filter(pk=SearchTests.post.pk).update(text='Байкал')
+        call_command(
+            'rebuild_search_index', batch_size=1, stdout=StringIO()
+        )
+        self.assertEqual(
+            self.search('байкал'),
+            [SearchTests.post],
+            'Индекс не пересобран',
+        )
+
+    def test_rebuild_keeps_index_complete(self):
+        """Во время пересборки поиск находит все посты"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, text) VALUES (%s, %s)',
+                [10 ** 6, 'Удаленный пост'],
+            )
+        found = []
+        atomic = transaction.atomic
+
+        def checked_atomic(*args, **kwargs):
+            found.append(search_posts('пирога').count())
+            return atomic(*args, **kwargs)
+
+        with mock.patch('posts.search.transaction.atomic', checked_atomic):
+            call_command(
+                'rebuild_search_index', batch_size=1, stdout=StringIO()
+            )
+        self.assertEqual(set(found), {1}, 'Пост пропадал из поиска')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {SEARCH_TABLE} WHERE rowid = %s',
+                [10 ** 6],
+            )
+            self.assertEqual(
+                cursor.fetchone()[0], 0, 'В индексе осталась лишняя строка',
+            )
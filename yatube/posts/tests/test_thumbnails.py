@@ -0,0 +1,198 @@
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from ..kvstore import KVStore
+from ..models import ImageVariant, Post
+from ..thumbnails import VARIANT_FORMATS, VARIANT_WIDTHS, generate_variants
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_WORKERS=0)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        cls.post = Post.objects.create(
+            text='Текст тестового поста',
+            author=cls.author,
+            image=SimpleUploadedFile(
+                name='thumb.gif',
+                content=small_gif,
+                content_type='image/gif',
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_pregenerate_thumbnails(self):
+        """Команда передает на обработку каждое изображение постов"""
+        with mock.patch(
+            'posts.management.commands.pregenerate_thumbnails.'
+            'process_post_image',
+            return_value=len(VARIANT_WIDTHS),
+        ) as process:
+            call_command('pregenerate_thumbnails', stdout=StringIO())
+        process.assert_called_once_with(ThumbnailTests.post.pk)
+
+    def test_thumbnails_prefetched(self):
+        """Метаданные миниатюр страницы читаются одним запросом"""
+        ThumbnailTests.post.image.open('rb')
+        content = ThumbnailTests.post.image.read()
+        ThumbnailTests.post.image.close()
+        for number in range(2):
+            Post.objects.create(
+                text=f'Пост {number}',
+                author=ThumbnailTests.author,
+                image=SimpleUploadedFile(
+                    name=f'thumb{number}.gif',
+                    content=content,
+                    content_type='image/gif',
+                ),
+            )
+        with CaptureQueriesContext(connection) as queries:
+            Client().get(reverse('posts:index'))
+        kvstore_queries = [
+            query for query in queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(
+            len(kvstore_queries),
+            1,
+            'Метаданные миниатюр читаются отдельно для каждого поста',
+        )
+
+    def test_thumbnail_metadata_shared(self):
+        """Метаданные миниатюр видны другим процессам без общего кеша"""
+        writer, reader = KVStore(), KVStore()
+        writer._set_raw('sorl-thumbnail||shared', '{"name": "shared.jpg"}')
+        cache.clear()
+        self.assertEqual(
+            reader._get_raw('sorl-thumbnail||shared'),
+            '{"name": "shared.jpg"}',
+        )
+        writer._delete_raw('sorl-thumbnail||shared')
+        self.assertIsNone(reader._get_raw('sorl-thumbnail||shared'))
+
+    def test_image_variants(self):
+        """Карточка поста выводит srcset из подготовленных вариантов"""
+        buffer = BytesIO()
+        Image.new('RGB', (1000, 500), 'red').save(buffer, 'PNG')
+        post = Post.objects.create(
+            text='Пост с большой картинкой',
+            author=ThumbnailTests.author,
+            image=SimpleUploadedFile(
+                name='large.png',
+                content=buffer.getvalue(),
+                content_type='image/png',
+            ),
+        )
+        self.assertEqual(
+            generate_variants(post.pk),
+            len(VARIANT_WIDTHS) * len(VARIANT_FORMATS),
+            'Созданы не все варианты изображения',
+        )
+        response = Client().get(reverse('posts:index'))
+        picture = post.picture
+        self.assertContains(response, f'srcset="{picture["webp"]}"')
+        self.assertContains(response, f'srcset="{picture["jpeg"]}"')
+        self.assertContains(response, 'width="960" height="339"')
+
+    def test_variants_refresh_pages_of_other_processes(self):
+        """Варианты из пула процессов сбрасывают кеш страниц веб-процесса"""
+        buffer = BytesIO()
+        Image.new('RGB', (1000, 500), 'red').save(buffer, 'PNG')
+        post = Post.objects.create(
+            text='Пост с большой картинкой',
+            author=ThumbnailTests.author,
+            image=SimpleUploadedFile(
+                name='large.png',
+                content=buffer.getvalue(),
+                content_type='image/png',
+            ),
+        )
+        client = Client()
+        client.get(reverse('posts:index'))
+        pool_cache = LocMemCache('pool', {})
+        with mock.patch('posts.cache.cache', pool_cache):
+            generate_variants(post.pk)
+        response = client.get(reverse('posts:index'))
+        self.assertContains(response, f'srcset="{post.picture["jpeg"]}"')
+
+    def test_only_webp_variants(self):
+        """Без JPEG-вариантов карточка выводит миниатюру sorl"""
+        post = ThumbnailTests.post
+        ImageVariant.objects.create(
+            post=post,
+            source=post.image.name,
+            image='posts/variants/only.webp',
+            format=ImageVariant.WEBP,
+            width=480,
+            height=240,
+        )
+        self.assertIsNone(Post.objects.get(pk=post.pk).picture)
+        response = Client().get(reverse('posts:index'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotContains(response, 'only.webp')
+
+    def test_replaced_image_variants_discarded(self):
+        """После замены изображения карточка не выводит старые варианты"""
+        buffer = BytesIO()
+        Image.new('RGB', (1000, 500), 'red').save(buffer, 'PNG')
+        post = Post.objects.create(
+            text='Пост с большой картинкой',
+            author=ThumbnailTests.author,
+            image=SimpleUploadedFile(
+                name='large.png',
+                content=buffer.getvalue(),
+                content_type='image/png',
+            ),
+        )
+        generate_variants(post.pk)
+        old_files = [
+            variant.image.path for variant in post.image_variants.all()
+        ]
+        # TestCase не коммитит транзакцию, поэтому файлы удаляются сразу.
+        with mock.patch(
+            'posts.thumbnails.transaction.on_commit', lambda func: func(),
+        ):
+            post.image = ThumbnailTests.post.image.name
+            post.save()
+        self.assertIsNone(post.picture, 'Выводятся варианты старой картинки')
+        self.assertFalse(
+            ImageVariant.objects.filter(post=post).exists(),
+            'Варианты старой картинки не удалены',
+        )
+        self.assertFalse(
+            any(os.path.exists(path) for path in old_files),
+            'Файлы вариантов старой картинки не удалены',
+        )
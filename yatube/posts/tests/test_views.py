@@ -1,17 +1,32 @@
+import base64
 import shutil
 import tempfile
+import time
+from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.core.paginator import Page
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
 
+from ..cache import (GROUP_SCOPE, POSTS_SCOPE, attach_cached_cards,
+                     card_cache_key)
 from ..forms import PostForm
-from ..models import Follow, Group, Post
+from ..models import (CacheVersion, Comment, Follow, Group, ImageVariant, Like,
+                      Post, Timeline, UserStats)
+from ..paginators import CachedCountPaginator, encode_cursor
+from ..services import add_like, follow_author
 
 User = get_user_model()
 COUNT_TEST_POSTS: int = 13
@@ -301,6 +316,131 @@ class PaginationViewsTests(TestCase):
                     f'Количество объектов на второй странице {page} ошибочно',
                 )
 
+    def test_cursor_pagination_correct(self):
+        """Курсорная пагинация возвращает соседние страницы"""
+        page = reverse('posts:index')
+        first_page = self.guest.get(page).context['page_obj']
+        response = self.guest.get(
+            page, {'after': encode_cursor(first_page[-1])}
+        )
+        second_page = response.context['page_obj']
+        self.assertEqual(
+            len(second_page),
+            COUNT_RECORDS_ON_SECOND_PAGE,
+            'Количество объектов после курсора ошибочно',
+        )
+        self.assertFalse(second_page.has_next())
+        response = self.guest.get(
+            page, {'before': second_page.previous_cursor}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']),
+            list(first_page),
+            'Страница до курсора не совпадает с первой страницей',
+        )
+
+    def test_cursor_invalid_values(self):
+        """Курсор с недопустимыми для базы значениями дает первую страницу"""
+        first_page = list(self.guest.get(
+            reverse('posts:index'),
+        ).context['page_obj'])
+        for raw in (
+            '2020-01-01T00:00:00+00:00|5',
+            '2020-01-01T00:00:00|99999999999999999999999',
+            '2020-01-01T00:00:00|0',
+        ):
+            token = base64.urlsafe_b64encode(raw.encode()).decode()
+            for direction in ('after', 'before'):
+                with self.subTest(raw=raw, direction=direction):
+                    response = self.guest.get(
+                        reverse('posts:index'), {direction: token},
+                    )
+                    self.assertEqual(response.status_code, HTTPStatus.OK)
+                    self.assertEqual(
+                        list(response.context['page_obj']), first_page,
+                    )
+
+    def count_queries(self, queries):
+        return [
+            query for query in queries if 'COUNT(' in query['sql'].upper()
+        ]
+
+    def test_paginator_counts_without_count_query(self):
+        """Короткий список считается без отдельного COUNT(*)"""
+        with CaptureQueriesContext(connection) as queries:
+            page = CachedCountPaginator(
+                Post.objects.all(), COUNT_TEST_POSTS + 1
+            ).get_page(1)
+            self.assertEqual(page.paginator.count, COUNT_TEST_POSTS)
+        self.assertEqual(self.count_queries(queries), [])
+
+    def test_paginator_first_page_without_count_query(self):
+        """Первая страница длинного списка строится без COUNT(*)"""
+        with CaptureQueriesContext(connection) as queries:
+            page = CachedCountPaginator(Post.objects.all(), 2).get_page(1)
+            self.assertTrue(page.has_next())
+            self.assertEqual(page.next_page_number(), 2)
+            self.assertEqual(list(page.paginator.page_window), [1, 2])
+        self.assertEqual(self.count_queries(queries), [])
+
+    def test_paginator_last_page(self):
+        """Номер last открывает последнюю страницу"""
+        page = CachedCountPaginator(Post.objects.all(), 5).get_page('last')
+        self.assertEqual(page.number, 3)
+        self.assertFalse(page.has_next())
+
+    def test_paginator_out_of_range_pages(self):
+        """Несуществующие номера страниц открывают последнюю страницу"""
+        last_page = COUNT_TEST_POSTS // COUNT_RECORDS_ON_FIRST_PAGE + 1
+        for number in ('-1', '0', '99', '99999999999999999999999'):
+            with self.subTest(number=number):
+                response = self.guest.get(
+                    reverse('posts:index'), {'page': number},
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(
+                    response.context['page_obj'].number, last_page,
+                )
+
+    def test_paginator_counts_scoped(self):
+        """Новый пост сбрасывает количество только своих списков"""
+        group_posts = Post.objects.filter(group=PaginationViewsTests.group)
+        scopes = (GROUP_SCOPE.format(slug=PaginationViewsTests.group.slug),)
+        CachedCountPaginator(
+            group_posts, COUNT_TEST_POSTS + 1, scopes=scopes,
+        ).get_page(1)
+        other_group = Group.objects.create(title='Другая', slug='other')
+        Post.objects.create(
+            text='Пост другой группы',
+            author=PaginationViewsTests.author,
+            group=other_group,
+        )
+        paginator = CachedCountPaginator(group_posts, 1, scopes=scopes)
+        self.assertEqual(paginator.cached_count(), COUNT_TEST_POSTS)
+        Post.objects.create(
+            text='Пост группы',
+            author=PaginationViewsTests.author,
+            group=PaginationViewsTests.group,
+        )
+        paginator = CachedCountPaginator(group_posts, 1, scopes=scopes)
+        self.assertIsNone(paginator.cached_count())
+
+    def test_paginator_page_window(self):
+        """Ссылки строятся только для окна страниц вокруг текущей"""
+        paginator = CachedCountPaginator(Post.objects.all(), 1)
+        page = paginator.get_page(7)
+        self.assertEqual(
+            list(page.paginator.page_window),
+            [5, 6, 7, 8],
+            'Без количества окно должно заканчиваться следующей страницей',
+        )
+        self.assertEqual(paginator.count, COUNT_TEST_POSTS)
+        self.assertEqual(
+            list(page.paginator.page_window),
+            [5, 6, 7, 8, 9],
+            'Окно страниц не соответствует ожидаемому',
+        )
+
 
 class GroupPostTests(TestCase):
     COUNT_RECORDS_ON_PAGE: int = 1
@@ -388,22 +528,173 @@ class GroupPostTests(TestCase):
         content = self.authorized_client.get(
             reverse('posts:index')
         ).content
+        Post.objects.filter(pk=post.pk).update(text='Новый текст поста')
+        cached_content = self.authorized_client.get(
+            reverse('posts:index')
+        ).content
+        self.assertEqual(
+            content,
+            cached_content,
+            'Кеш не сохранился'
+        )
         post.delete()
         content_after_delete = self.authorized_client.get(
             reverse('posts:index')
         ).content
-        self.assertEqual(
+        self.assertNotEqual(
             content,
             content_after_delete,
-            'Кеш не сохранился'
+            'Кеш остался после удаления поста'
         )
         cache.clear()
         cache_clear_content = self.authorized_client.get(
             reverse('posts:index')).content
-        self.assertNotEqual(
-            content,
+        self.assertEqual(
+            content_after_delete,
             cache_clear_content,
-            'Кеш остался после очистки'
+            'Страница после удаления поста не соответствует ожидаемой'
+        )
+
+    def test_group_page_cache_invalidated(self):
+        """Кеш страницы группы сбрасывается при изменении поста"""
+        url = reverse(
+            'posts:group_list',
+            kwargs={'slug': GroupPostTests.group_correct.slug}
+        )
+        post = Post.objects.create(
+            text='Текст тестового поста',
+            author=GroupPostTests.author,
+            group=GroupPostTests.group_correct,
+        )
+        self.authorized_client.get(url)
+        post.text = 'Новый текст поста'
+        post.save()
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'Новый текст поста')
+
+    def test_group_page_cache_author_renamed(self):
+        """Кеш страницы группы сбрасывается при смене имени автора"""
+        url = reverse(
+            'posts:group_list',
+            kwargs={'slug': GroupPostTests.group_correct.slug}
+        )
+        self.authorized_client.get(url)
+        author = User.objects.get(pk=GroupPostTests.author.pk)
+        author.first_name = 'Переименованный'
+        author.save()
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'Переименованный')
+
+    def test_page_cache_shared_version(self):
+        """Версия, измененная другим процессом, сбрасывает кеш страницы"""
+        url = reverse('posts:index')
+        self.authorized_client.get(url)
+        Post.objects.filter(pk=GroupPostTests.post.pk).update(
+            text='Текст из другого процесса',
+        )
+        CacheVersion.objects.filter(scope=POSTS_SCOPE).update(
+            changed=timezone.now(),
+        )
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'Текст из другого процесса')
+
+    def test_page_cache_reads_do_not_write_versions(self):
+        """Чтение страниц, в том числе 404, не создает версии кеша"""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'missing'}),
+            reverse('posts:profile', kwargs={'username': 'missing'}),
+            reverse('posts:post_detail', kwargs={'post_id': 10 ** 9}),
+        ]
+        versions = CacheVersion.objects.count()
+        for url in urls:
+            self.client.get(url)
+        self.assertEqual(CacheVersion.objects.count(), versions)
+
+    def test_post_card_cache(self):
+        """Карточка поста берется из кеша до изменения поста"""
+        post = Post.objects.select_related('author').get(
+            pk=GroupPostTests.post.pk
+        )
+        attach_cached_cards([post])
+        self.assertEqual(
+            cache.get(card_cache_key(post)),
+            post.cached_card,
+            'Карточка поста не сохранилась в кеше',
+        )
+        old_key = card_cache_key(post)
+        post.text = 'Новый текст поста'
+        self.assertNotEqual(
+            card_cache_key(post),
+            old_key,
+            'Ключ карточки не изменился после изменения поста',
+        )
+
+    def test_post_detail_not_modified(self):
+        """Страница поста отвечает 304, пока пост не изменился"""
+        url = reverse(
+            'posts:post_detail', kwargs={'post_id': GroupPostTests.post.id}
+        )
+        etag = self.authorized_client.get(url)['ETag']
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(
+            response.status_code,
+            HTTPStatus.NOT_MODIFIED,
+            'Неизмененная страница отдана целиком',
+        )
+        self.authorized_client.post(
+            reverse(
+                'posts:add_comment',
+                kwargs={'post_id': GroupPostTests.post.id}
+            ),
+            data={'text': 'Текст тестового комментария'},
+        )
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(
+            response.status_code,
+            HTTPStatus.OK,
+            'Страница не обновилась после нового комментария',
+        )
+
+    def test_no_last_modified(self):
+        """Страница не отвечает 304 по одной дате с точностью в секунду"""
+        url = reverse(
+            'posts:group_list',
+            kwargs={'slug': GroupPostTests.group_correct.slug}
+        )
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Last-Modified'))
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60),
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_validators_shared_between_processes(self):
+        """Валидаторы страницы не зависят от кеша процесса"""
+        url = reverse(
+            'posts:group_list',
+            kwargs={'slug': GroupPostTests.group_correct.slug}
+        )
+        response = self.client.get(url)
+        cache.clear()
+        response = self.client.get(
+            url,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(
+            response.status_code,
+            HTTPStatus.NOT_MODIFIED,
+            'Другой процесс выдал другие валидаторы',
+        )
+        etag = self.client.get(url)['ETag']
+        CacheVersion.objects.filter(
+            scope=GROUP_SCOPE.format(slug=GroupPostTests.group_correct.slug),
+        ).update(changed=timezone.now())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(
+            response.status_code,
+            HTTPStatus.OK,
+            'Изменение в другом процессе не учтено',
         )
 
 
@@ -489,3 +780,312 @@ class FollowTests(TestCase):
             response.context['page_obj'].object_list,
             'Запись отображается у того, кто не подписан',
         )
+
+    def test_unfollow_trims_timeline(self):
+        """После отписки записи автора пропадают из ленты"""
+        Follow.objects.create(
+            user=FollowTests.follower,
+            author=FollowTests.author,
+        )
+        self.follower_client.get(
+            reverse(
+                'posts:profile_unfollow',
+                kwargs={'username': FollowTests.author}
+            )
+        )
+        response = self.follower_client.get(reverse('posts:follow_index'))
+        self.assertNotIn(
+            FollowTests.post,
+            response.context['page_obj'].object_list,
+            'Запись осталась в ленте после отписки',
+        )
+
+    def test_follow_prolific_author(self):
+        """Подписка на автора с сотнями записей заполняет ленту целиком"""
+        Post.objects.bulk_create(
+            Post(text=f'Запись {index}', author=FollowTests.author)
+            for index in range(600)
+        )
+        Follow.objects.create(
+            user=FollowTests.follower,
+            author=FollowTests.author,
+        )
+        self.assertEqual(
+            Timeline.objects.filter(user=FollowTests.follower).count(),
+            Post.objects.filter(author=FollowTests.author).count(),
+            'Лента подписок заполнена не полностью',
+        )
+
+    def test_rebuild_timelines(self):
+        """Команда пересборки восстанавливает ленту подписок"""
+        Follow.objects.create(
+            user=FollowTests.follower,
+            author=FollowTests.author,
+        )
+        Timeline.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertTrue(
+            Timeline.objects.filter(
+                user=FollowTests.follower,
+                post=FollowTests.post,
+            ).exists(),
+            'Лента подписок не восстановилась',
+        )
+
+    def test_follow_stats(self):
+        """Счетчики подписок меняются при подписке и отписке"""
+        follow_url = reverse(
+            'posts:profile_follow', kwargs={'username': FollowTests.author}
+        )
+        self.follower_client.get(follow_url)
+        self.follower_client.get(follow_url)
+        response = self.author_client.get(
+            reverse('posts:profile', kwargs={'username': FollowTests.author})
+        )
+        self.assertEqual(
+            response.context['stats'].followers_count,
+            1,
+            'Счетчик подписчиков не увеличился',
+        )
+        self.follower_client.get(
+            reverse(
+                'posts:profile_unfollow',
+                kwargs={'username': FollowTests.author}
+            )
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=FollowTests.follower).following_count,
+            EMPTY,
+            'Счетчик подписок не уменьшился',
+        )
+
+    def test_recount_follows(self):
+        """Команда пересчета восстанавливает счетчики подписок"""
+        Follow.objects.create(
+            user=FollowTests.follower,
+            author=FollowTests.author,
+        )
+        UserStats.objects.all().delete()
+        call_command('recount_follows', stdout=StringIO())
+        self.assertEqual(
+            UserStats.objects.get(user=FollowTests.author).followers_count,
+            1,
+            'Счетчик подписчиков не пересчитан',
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=FollowTests.follower).following_count,
+            1,
+            'Счетчик подписок не пересчитан',
+        )
+
+
+class LikeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.user = User.objects.create_user(username='user')
+        cls.post = Post.objects.create(
+            text='Текст тестового поста',
+            author=cls.author,
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(LikeTests.user)
+        cache.clear()
+
+    def test_like_count(self):
+        """Счетчик лайков меняется при лайке и его отмене"""
+        like_url = reverse(
+            'posts:post_like', kwargs={'post_id': LikeTests.post.id}
+        )
+        self.authorized_client.get(like_url)
+        self.authorized_client.get(like_url)
+        LikeTests.post.refresh_from_db()
+        self.assertEqual(
+            LikeTests.post.total_likes,
+            1,
+            'Счетчик лайков не увеличился',
+        )
+        self.authorized_client.get(
+            reverse('posts:post_unlike', kwargs={'post_id': LikeTests.post.id})
+        )
+        LikeTests.post.refresh_from_db()
+        self.assertEqual(
+            LikeTests.post.total_likes,
+            EMPTY,
+            'Счетчик лайков не уменьшился',
+        )
+
+    def test_edit_keeps_concurrent_like(self):
+        """Редактирование поста не затирает лайк, поставленный во время него"""
+        edited = Post.objects.get(pk=LikeTests.post.pk)
+        add_like(Post.objects.get(pk=LikeTests.post.pk), LikeTests.user)
+        form = PostForm(data={'text': 'Измененный текст'}, instance=edited)
+        self.assertTrue(form.is_valid())
+        form.save()
+        LikeTests.post.refresh_from_db()
+        self.assertEqual(LikeTests.post.text, 'Измененный текст')
+        self.assertEqual(
+            LikeTests.post.like_count, 1, 'Лайк потерян при сохранении',
+        )
+
+    def test_duplicate_like(self):
+        """Повторный лайк не создает запись и не меняет счетчик"""
+        like = Like.objects.create(
+            user=LikeTests.user,
+            content_object=LikeTests.post,
+        )
+        self.assertEqual(add_like(LikeTests.post, LikeTests.user), like)
+        self.assertEqual(
+            Like.objects.filter(
+                user=LikeTests.user, object_id=LikeTests.post.id,
+            ).count(),
+            1,
+            'Создан дубликат лайка',
+        )
+        LikeTests.post.refresh_from_db()
+        self.assertEqual(
+            LikeTests.post.like_count, EMPTY, 'Счетчик лайков увеличился',
+        )
+
+    def test_recount_likes(self):
+        """Команда пересчета исправляет счетчик лайков"""
+        Like.objects.create(
+            user=LikeTests.user,
+            content_object=LikeTests.post,
+        )
+        call_command('recount_likes', stdout=StringIO())
+        LikeTests.post.refresh_from_db()
+        self.assertEqual(
+            LikeTests.post.like_count,
+            1,
+            'Счетчик лайков не пересчитан',
+        )
+
+    def test_page_liked_ids(self):
+        """Страница списка знает, какие посты лайкнул пользователь"""
+        self.authorized_client.get(
+            reverse('posts:post_like', kwargs={'post_id': LikeTests.post.id})
+        )
+        response = self.authorized_client.get(
+            reverse('posts:profile', kwargs={'username': LikeTests.author})
+        )
+        self.assertEqual(
+            response.context['page_obj'].liked_ids,
+            {LikeTests.post.id},
+            'Лайкнутые посты страницы не соответствуют ожидаемым',
+        )
+
+
+NO_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+    for alias in settings.CACHES
+}
+# Сколько запросов к базе может выполнить представление при пустом
+# кеше, включая чтение версий областей кеша. Число не должно зависеть
+# от количества постов на странице.
+QUERY_BUDGETS: dict = {
+    'posts:index': 7,
+    'posts:group_list': 8,
+    'posts:profile': 10,
+    'posts:post_detail': 8,
+    'posts:search': 6,
+    'posts:follow_index': 6,
+    'posts:likes_index': 6,
+    'posts:index_feed': 2,
+    'posts:group_feed': 3,
+    'posts:profile_feed': 3,
+}
+
+
+@override_settings(CACHES=NO_CACHES)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='budget')
+        follow_author(cls.reader, cls.author)
+
+    def setUp(self):
+        self.client.force_login(QueryBudgetTests.reader)
+
+    def add_posts(self, count):
+        """
+        Добавляет посты разных авторов с изображением, лайком и
+        комментарием, чтобы каждая карточка тянула свои связи.
+        """
+        for number in range(count):
+            author = QueryBudgetTests.author
+            if number % 2:
+                author = User.objects.create_user(
+                    username=f'author-{Post.objects.count()}',
+                )
+                follow_author(QueryBudgetTests.reader, author)
+            post = Post.objects.create(
+                text='Бюджет запросов',
+                author=author,
+                group=QueryBudgetTests.group,
+            )
+            if number % 2:
+                post.image = 'posts/budget.jpg'
+                post.save()
+                ImageVariant.objects.create(
+                    post=post,
+                    source=post.image.name,
+                    image='posts/variants/budget.jpg',
+                    format=ImageVariant.JPEG,
+                    width=480,
+                    height=170,
+                )
+            add_like(post, QueryBudgetTests.reader)
+            Comment.objects.create(
+                post=Post.objects.earliest('pub_date'),
+                author=author,
+                text='Комментарий',
+            )
+
+    def count_queries(self, name, page_size) -> int:
+        first_post = Post.objects.earliest('pub_date')
+        kwargs = {
+            'posts:group_list': {'slug': QueryBudgetTests.group.slug},
+            'posts:profile': {'username': QueryBudgetTests.author.username},
+            'posts:post_detail': {'post_id': first_post.pk},
+            'posts:index_feed': {'feed_format': 'atom'},
+            'posts:group_feed': {
+                'slug': QueryBudgetTests.group.slug, 'feed_format': 'rss',
+            },
+            'posts:profile_feed': {
+                'username': QueryBudgetTests.author.username,
+                'feed_format': 'atom',
+            },
+        }.get(name, {})
+        data = {'q': 'бюджет'} if name == 'posts:search' else {}
+        page_size_patch = mock.patch('posts.views.POST_PER_PAGE', page_size)
+        feed_size_patch = mock.patch('posts.feeds.FEED_SIZE', page_size)
+        with page_size_patch, feed_size_patch:
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(
+                    reverse(name, kwargs=kwargs), data,
+                )
+                if response.streaming:
+                    b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, HTTPStatus.OK, name)
+        return len(captured.captured_queries)
+
+    def test_query_budgets(self):
+        """Число запросов не растет с размером страницы"""
+        self.add_posts(6)
+        small = {name: self.count_queries(name, 2) for name in QUERY_BUDGETS}
+        self.add_posts(COUNT_TEST_POSTS * 3)
+        for name, budget in QUERY_BUDGETS.items():
+            with self.subTest(view=name):
+                queries = self.count_queries(name, COUNT_TEST_POSTS)
+                self.assertEqual(
+                    queries, small[name],
+                    'Число запросов зависит от количества постов',
+                )
+                self.assertLessEqual(queries, budget, 'Бюджет превышен')
@@ -0,0 +1,195 @@
+import logging
+import os
+from functools import partial
+from io import BytesIO
+
+from core.pool import submit
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from .cache import bump_versions, post_scopes
+from .kvstore import THUMBNAIL_GEOMETRIES
+from .models import ImageVariant, Post
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS: tuple = (480, 720, 960)
+VARIANT_RATIO: float = 339 / 960
+VARIANT_FORMATS: tuple = (
+    (ImageVariant.WEBP, 'WEBP'),
+    (ImageVariant.JPEG, 'JPEG'),
+)
+VARIANT_QUALITY: int = 80
+
+
+def generate_thumbnails(image_name) -> int:
+    """
+    Создает все миниатюры изображения, которые используют шаблоны.
+
+    Как и тег thumbnail, при THUMBNAIL_DEBUG = False только логирует
+    ошибки, чтобы одно испорченное изображение не останавливало обработку
+    остальных.
+
+    :param image_name: Имя файла изображения в хранилище.
+    :return: Количество обработанных размеров.
+    """
+    created = 0
+    for geometry, options in THUMBNAIL_GEOMETRIES:
+        try:
+            get_thumbnail(image_name, geometry, **options)
+        except Exception:
+            if thumbnail_settings.THUMBNAIL_DEBUG:
+                raise
+            logger.exception('Не удалось создать миниатюру %s', image_name)
+        else:
+            created += 1
+    return created
+
+
+def variant_widths(source_width) -> tuple:
+    """
+    Выбирает ширины вариантов, не превышающие ширину оригинала.
+
+    :param source_width: Ширина оригинала в пикселях.
+    :return: Ширины по возрастанию, как минимум самая маленькая.
+    """
+    widths = tuple(width for width in VARIANT_WIDTHS if width <= source_width)
+    return widths or VARIANT_WIDTHS[:1]
+
+
+def render_variants(post, image) -> list:
+    """
+    Кодирует варианты изображения во всех ширинах и форматах.
+
+    :param post: Пост, которому принадлежат варианты.
+    :param image: Декодированный оригинал в режиме RGB.
+    :return: Несохраненные объекты ImageVariant с записанными файлами.
+    """
+    stem = os.path.splitext(os.path.basename(post.image.name))[0]
+    variants = []
+    for width in variant_widths(image.width):
+        size = (width, round(width * VARIANT_RATIO))
+        resized = ImageOps.fit(image, size, Image.LANCZOS)
+        for variant_format, pil_format in VARIANT_FORMATS:
+            buffer = BytesIO()
+            resized.save(buffer, pil_format, quality=VARIANT_QUALITY)
+            variant = ImageVariant(
+                post=post,
+                source=post.image.name,
+                format=variant_format,
+                width=size[0],
+                height=size[1],
+            )
+            variant.image.save(
+                f'{stem}-{width}.{variant_format}',
+                ContentFile(buffer.getvalue()),
+                save=False,
+            )
+            variants.append(variant)
+    return variants
+
+
+def delete_variant_files(variants):
+    """
+    Удаляет файлы вариантов из хранилища.
+
+    :param variants: Объекты ImageVariant, строки которых уже удалены.
+    """
+    for variant in variants:
+        variant.image.delete(save=False)
+
+
+def discard_stale_variants(post) -> int:
+    """
+    Удаляет варианты, созданные не из текущего изображения поста.
+
+    Вызывается после замены или удаления изображения. Файлы удаляются
+    после коммита, чтобы откат транзакции не оставил строки без файлов.
+
+    :param post: Сохраненный пост.
+    :return: Количество удаленных вариантов.
+    """
+    stale = list(
+        ImageVariant.objects.filter(post=post).exclude(source=post.image.name)
+    )
+    if stale:
+        ImageVariant.objects.filter(
+            pk__in=[variant.pk for variant in stale],
+        ).delete()
+        transaction.on_commit(partial(delete_variant_files, stale))
+    return len(stale)
+
+
+def generate_variants(post_id) -> int:
+    """
+    Создает варианты изображения поста и заменяет ими прежние.
+
+    Если изображение успело смениться, результат отбрасывается: новые
+    варианты создаст задача, поставленная при следующем сохранении.
+    Версии страниц поста общие для всех процессов, поэтому их сброс в
+    пуле сразу виден веб-процессам.
+
+    :param post_id: Идентификатор поста.
+    :return: Количество созданных вариантов.
+    """
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=post_id,
+    ).first()
+    if post is None or not post.image:
+        return 0
+    with post.image.open('rb'), Image.open(post.image) as source:
+        source.draft('RGB', (VARIANT_WIDTHS[-1], VARIANT_WIDTHS[-1]))
+        image = source.convert('RGB')
+    variants = render_variants(post, image)
+    with transaction.atomic():
+        current = Post.objects.select_for_update().filter(
+            pk=post_id, image=post.image.name,
+        ).exists()
+        if current:
+            stale = list(post.image_variants.all())
+            ImageVariant.objects.filter(
+                pk__in=[variant.pk for variant in stale],
+            ).delete()
+            ImageVariant.objects.bulk_create(variants)
+        else:
+            stale, variants = variants, []
+    delete_variant_files(stale)
+    if variants:
+        bump_versions(*post_scopes(post))
+    return len(variants)
+
+
+def process_post_image(post_id) -> int:
+    """
+    Готовит все производные изображения поста.
+
+    Выполняется в пуле процессов: создает миниатюры для шаблонов и
+    варианты для адаптивных карточек.
+
+    :param post_id: Идентификатор поста.
+    :return: Количество созданных вариантов.
+    """
+    image_name = Post.objects.filter(pk=post_id).values_list(
+        'image', flat=True,
+    ).first()
+    if not image_name:
+        return 0
+    generate_thumbnails(image_name)
+    try:
+        return generate_variants(post_id)
+    except (OSError, ValueError):
+        logger.exception('Не удалось создать варианты %s', image_name)
+        return 0
+
+
+def schedule_image_processing(post):
+    """
+    Ставит обработку изображения поста в пул процессов после коммита.
+
+    :param post: Сохраненный пост.
+    """
+    if post.image:
+        transaction.on_commit(partial(submit, process_post_image, post.pk))
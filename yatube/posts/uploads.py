@@ -0,0 +1,83 @@
+from tempfile import SpooledTemporaryFile
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from PIL import Image, ImageOps
+
+MAX_UPLOAD_BYTES: int = 10 * 1024 * 1024
+MAX_IMAGE_PIXELS: int = 40_000_000
+MAX_STORED_SIDE: int = 2048
+SPOOL_MAX_SIZE: int = 2 * 1024 * 1024
+JPEG_QUALITY: int = 85
+
+
+def check_limits(upload, image):
+    """
+    Проверяет размер файла и количество пикселей изображения.
+
+    Размеры читаются из заголовка, пиксели при этом не декодируются.
+
+    :param upload: Загруженный файл.
+    :param image: Открытое, но не загруженное изображение.
+    """
+    if upload.size > MAX_UPLOAD_BYTES:
+        raise ValidationError(
+            'Файл больше %(limit)d МБ.',
+            code='file_too_large',
+            params={'limit': MAX_UPLOAD_BYTES // (1024 * 1024)},
+        )
+    width, height = image.size
+    if width * height > MAX_IMAGE_PIXELS:
+        raise ValidationError(
+            'Изображение больше %(limit)d мегапикселей.',
+            code='too_many_pixels',
+            params={'limit': MAX_IMAGE_PIXELS // 1_000_000},
+        )
+
+
+def needs_processing(image) -> bool:
+    """
+    Показывает, нужно ли перекодировать изображение перед сохранением.
+
+    Анимации сохраняются как есть, иначе останется только первый кадр.
+
+    :param image: Открытое изображение.
+    """
+    if getattr(image, 'is_animated', False):
+        return False
+    return max(image.size) > MAX_STORED_SIDE or bool(image.getexif())
+
+
+def prepare_image(upload):
+    """
+    Готовит загруженное изображение к сохранению.
+
+    Крупные изображения уменьшаются до MAX_STORED_SIDE уже при
+    декодировании (draft для JPEG, reduce для остальных форматов), затем
+    поворачиваются по EXIF, а сами метаданные EXIF отбрасываются.
+    Результат пишется во временный файл, который уходит на диск, если
+    превышает SPOOL_MAX_SIZE. Подходящие файлы возвращаются без изменений.
+
+    :param upload: Загруженный файл, прошедший проверку ImageField.
+    :return: Файл для сохранения в поле модели.
+    """
+    upload.seek(0)
+    with Image.open(upload) as image:
+        check_limits(upload, image)
+        if not needs_processing(image):
+            upload.seek(0)
+            return upload
+        # Снимки телефонов часто открываются как MPO - это тот же JPEG.
+        image_format = 'JPEG' if image.format == 'MPO' else image.format
+        image.thumbnail((MAX_STORED_SIDE, MAX_STORED_SIDE), reducing_gap=2.0)
+        image = ImageOps.exif_transpose(image)
+        output = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        image.save(
+            output,
+            image_format,
+            exif=b'',
+            icc_profile=image.info.get('icc_profile'),
+            quality=JPEG_QUALITY,
+        )
+    output.seek(0)
+    return File(output, name=upload.name)
@@ -2,7 +2,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.urls import path
 
-from . import views
+from . import feeds, views
 
 app_name = 'posts'
 
@@ -17,6 +17,7 @@ urlpatterns = [
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    path('search/', views.search, name='search'),
     path('follow/', views.follow_index, name='follow_index'),
     path('likes/', views.likes_index, name='likes_index'),
     path(
@@ -39,6 +40,17 @@ urlpatterns = [
         views.unlike,
         name='post_unlike'
     ),
+    path('feed/<str:feed_format>/', feeds.index_feed, name='index_feed'),
+    path(
+        'group/<slug:slug>/feed/<str:feed_format>/',
+        feeds.group_feed,
+        name='group_feed'
+    ),
+    path(
+        'profile/<str:username>/feed/<str:feed_format>/',
+        feeds.profile_feed,
+        name='profile_feed'
+    ),
 ]
 
 if settings.DEBUG:
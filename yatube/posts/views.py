@@ -1,35 +1,64 @@
+from urllib.parse import urlencode
+
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 
+from .cache import (AUTHOR_SCOPE, FEED_SCOPE, GROUP_SCOPE, LIKES_SCOPE,
+                    POSTS_SCOPE, attach_cached_cards, cache_versioned_page,
+                    conditional_page, post_detail_scopes)
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post
-from .services import add_like, is_liked, remove_like
+from .paginators import CachedCountPaginator, CursorPaginator
+from .search import search_posts
+from .services import (add_like, follow_author, get_author_posts,
+                       get_follow_posts, get_group_posts, get_index_posts,
+                       get_liked_ids, get_liked_posts, get_user_stats,
+                       is_liked, remove_like, unfollow_author)
+from .thumbnails import schedule_image_processing
 
 POST_PER_PAGE: int = 10
 
 User = get_user_model()
 
 
-def make_paginator(request, post_list):
+def make_paginator(request, post_list, scopes=(POSTS_SCOPE,)):
     """
     Функция для создания объекта пагинатора.
 
+    Если в запросе передан курсор (after или before), используется
+    курсорная пагинация по (pub_date, id), иначе - постраничная.
+    К странице прикрепляется множество liked_ids с постами, которые
+    лайкнул пользователь, а к постам - карточки из кеша.
+
     Аргументы:
     - request (HttpRequest): объект запроса
     - post_list (QuerySet): список постов
+    - scopes (tuple): области списка, по которым сбрасывается
+      закешированное количество постов
 
     Возвращает:
     - Page: объект страницы пагинации
     """
-    paginator = Paginator(post_list, POST_PER_PAGE)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
-
-
-@cache_page(20)
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if after or before:
+        paginator = CursorPaginator(post_list, POST_PER_PAGE)
+        if before:
+            page_obj = paginator.page_before(before)
+        else:
+            page_obj = paginator.page_after(after)
+    else:
+        paginator = CachedCountPaginator(
+            post_list, POST_PER_PAGE, scopes=scopes,
+        )
+        page_obj = paginator.get_page(request.GET.get('page'))
+    page_obj.liked_ids = get_liked_ids(page_obj, request.user)
+    attach_cached_cards(page_obj)
+    return page_obj
+
+
+@cache_versioned_page(POSTS_SCOPE)
 def index(request):
     """
     Класс представления главной страницы.
@@ -42,7 +71,7 @@ def index(request):
     """
     page_obj = make_paginator(
         request,
-        Post.objects.select_related('group', 'author').all(),
+        get_index_posts(),
     )
     context = {
         'page_obj': page_obj,
@@ -50,6 +79,8 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@conditional_page(GROUP_SCOPE)
+@cache_versioned_page(GROUP_SCOPE)
 def group_posts(request, slug):
     """
     Класс представления страницы со списком постов в группе.
@@ -64,7 +95,8 @@ def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     page_obj = make_paginator(
         request,
-        group.posts.select_related('author').all(),
+        get_group_posts(group),
+        (GROUP_SCOPE.format(slug=group.slug),),
     )
     context = {
         'group': group,
@@ -73,6 +105,8 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_page(AUTHOR_SCOPE)
+@cache_versioned_page(AUTHOR_SCOPE)
 def profile(request, username):
     """
     Класс представления страницы профиля пользователя.
@@ -87,7 +121,8 @@ def profile(request, username):
     author = get_object_or_404(User, username=username)
     page_obj = make_paginator(
         request,
-        author.posts.select_related('group').all()
+        get_author_posts(author),
+        (AUTHOR_SCOPE.format(username=author.username),),
     )
     following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user,
@@ -96,10 +131,12 @@ def profile(request, username):
     context = {'page_obj': page_obj,
                'author': author,
                'following': following,
+               'stats': get_user_stats(author),
                }
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_page(post_detail_scopes)
 def post_detail(request, post_id):
     """
     Класс представления страницы поста.
@@ -111,9 +148,11 @@ def post_detail(request, post_id):
     Возвращает:
     - HttpResponse: ответ с отображением страницы
     """
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), id=post_id,
+    )
     form = CommentForm()
-    comments = post.comments.all()
+    comments = post.comments.select_related('author')
     post_is_liked = is_liked(post, request.user)
     context = {
         'post': post,
@@ -125,6 +164,29 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+def search(request):
+    """
+    Класс представления страницы поиска постов.
+
+    Аргументы:
+    - request (HttpRequest): объект запроса
+
+    Возвращает:
+    - HttpResponse: ответ с отображением страницы
+    """
+    query = request.GET.get('q', '').strip()
+    page_obj = make_paginator(
+        request,
+        search_posts(query).select_related('group', 'author'),
+    )
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     """
@@ -145,6 +207,8 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        if 'image' in form.changed_data:
+            schedule_image_processing(post)
         return redirect('posts:profile', author.username)
     context = {
         'form': form,
@@ -173,7 +237,9 @@ def post_edit(request, post_id):
         instance=edit_post,
     )
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data:
+            schedule_image_processing(post)
         return redirect('posts:post_detail', post_id)
     context = {'form': form,
                'is_edit': True,
@@ -198,7 +264,8 @@ def add_comment(request, post_id):
 def follow_index(request):
     page_obj = make_paginator(
         request,
-        Post.objects.filter(author__following__user=request.user).all(),
+        get_follow_posts(request.user),
+        (POSTS_SCOPE, FEED_SCOPE.format(user_id=request.user.pk)),
     )
     context = {
         'page_obj': page_obj,
@@ -210,7 +277,8 @@ def follow_index(request):
 def likes_index(request):
     page_obj = make_paginator(
         request,
-        Post.objects.filter(likes__user=request.user).all(),
+        get_liked_posts(request.user),
+        (POSTS_SCOPE, LIKES_SCOPE.format(user_id=request.user.pk)),
     )
     context = {
         'page_obj': page_obj,
@@ -221,17 +289,14 @@ def likes_index(request):
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    if request.user != author:
-        Follow.objects.get_or_create(user=request.user, author=author)
+    follow_author(request.user, author)
     return redirect('posts:profile', username)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    follower = Follow.objects.filter(user=request.user, author=author)
-    if follower.exists():
-        follower.delete()
+    unfollow_author(request.user, author)
     return redirect('posts:profile', username=author)
 
 
@@ -46,10 +46,13 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,6 +64,8 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'yatube.urls'
 
+TEST_RUNNER = 'core.testing.QueryCheckingRunner'
+
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
@@ -143,7 +148,46 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
 }
 
+# Метаданные миниатюр хранятся только в базе: они общие для всех
+# процессов и переживают рестарт.
+THUMBNAIL_KVSTORE = 'posts.kvstore.KVStore'
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+# Процессы для фоновой обработки изображений. 0 - без пула.
+BACKGROUND_WORKERS = 2
+
+# Доля запросов, которые профилирует ServerTimingMiddleware. 0 - выключено.
+SERVER_TIMING_SAMPLE_RATE = 0
+
+# Метрики для /metrics. Процессы сервиса, запущенные через wsgi.py,
+# складывают значения в свои файлы в METRICS_DIR - отдельный каталог
+# каждого развертывания. Метрики отдаются сотрудникам и по заголовку
+# Authorization: Bearer <METRICS_TOKEN>.
+METRICS_ENABLED = True
+METRICS_DIR = os.environ.get(
+    'YATUBE_METRICS_DIR', os.path.join(BASE_DIR, 'metrics')
+)
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN')
+
+# Запросы дольше порога в миллисекундах пишутся с планом в SLOW_QUERY_LOG -
+# отдельный файл каждого развертывания, сводка - команда
+# slow_query_report. None - журнал выключен, в тестах выключен всегда.
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_LOG = os.environ.get(
+    'YATUBE_SLOW_QUERY_LOG', os.path.join(BASE_DIR, 'logs', 'slow_queries.jsonl')
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.middleware': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}